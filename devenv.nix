@@ -40,6 +40,12 @@
     cli.exec = ''
       python -m src.cli.cli
     '';
+    importtime.exec = ''
+      python scripts/check_import_time.py "$@"
+    '';
+    stresscache.exec = ''
+      python scripts/stress_cache.py "$@"
+    '';
   };
 
   enterShell = ''
@@ -57,6 +63,7 @@
   enterTest = ''
     echo "Running tests"
     git --version | grep --color=auto "${pkgs.git.version}"
+    python scripts/check_import_time.py
   '';
 
   # https://devenv.sh/pre-commit-hooks/
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""Fail when importing the CLI for `a3t --help` gets slow again.
+
+Runs `python -X importtime` on the CLI entry modules and checks that:
+  - the heavy dependencies are not imported at startup (they must stay lazy)
+  - the import time of our own code, excluding typer itself, stays under the budget
+
+Usage: python scripts/check_import_time.py [budget_ms]   (default: $A3T_IMPORT_BUDGET_MS or 60)
+"""
+import os
+import re
+import subprocess
+import sys
+
+ENTRY_MODULES = ["cli.cli", "cli2.main"]
+# Modules that must only be imported on the code paths that need them
+LAZY_MODULES = ["cookiecutter", "jinja2", "requests", "urllib3", "yaml"]
+LINE_RE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \|\s*(\S+)")
+
+
+def import_times(module: str) -> dict[str, int]:
+    """Cumulative import time (us) of every top-level import made while importing `module`"""
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env = {**os.environ, "PYTHONPATH": os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))}
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, env=env, check=True,
+    )
+    times = {}
+    for line in result.stderr.splitlines():
+        match = LINE_RE.match(line)
+        if match:
+            times[match.group(2)] = int(match.group(1))
+    return times
+
+
+def main() -> int:
+    budget_ms = float(sys.argv[1] if len(sys.argv) > 1 else os.environ.get("A3T_IMPORT_BUDGET_MS", 60))
+    failed = False
+    for module in ENTRY_MODULES:
+        times = import_times(module)
+        eager = [name for name in LAZY_MODULES if name in times]
+        own_ms = (times[module] - times.get("typer", 0)) / 1000
+        print(f"{module}: {own_ms:.1f}ms without typer ({times[module] / 1000:.1f}ms total)")
+        if eager:
+            print(f"  imported at startup: {', '.join(eager)}")
+            failed = True
+        if own_ms > budget_ms:
+            print(f"  over the {budget_ms:.0f}ms budget")
+            failed = True
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""Run N concurrent builds against one shared a3t cache and check nothing got corrupted.
+
+Every worker is a separate process (like parallel CI jobs on one agent) that fetches
+the same template snapshot, reads a cached file and rewrites a shared JSON entry,
+all against the same $A3T_CACHE_DIR. The template repository is a local git repo
+that git transparently substitutes for github.com, so no network is needed.
+
+Checks that every worker saw the same file tree, that the repository was fetched
+only once per cache entry and that `a3t cache verify` finds no problems afterwards.
+
+Usage: python scripts/stress_cache.py [workers] [rounds]   (default: 16 workers, 3 rounds)
+"""
+import os
+import sys
+import json
+import hashlib
+import tempfile
+import subprocess
+import multiprocessing
+
+ORGANIZATION = "a3t-stress"
+REPOSITORY = "template"
+# archive downloads a tarball over HTTP, so only the git based strategies run here
+STRATEGIES = ["mirror", "shallow", "partial", "sparse"]
+SUBDIRECTORY = "template"
+
+
+def make_repository(base: str) -> str:
+    """Create a small template repository and return its HEAD commit"""
+    path = os.path.join(base, "repo")
+    os.makedirs(os.path.join(path, SUBDIRECTORY, "{{cookiecutter.project_slug}}"))
+    with open(os.path.join(path, SUBDIRECTORY, "cookiecutter.json"), "w") as file:
+        json.dump({"project_slug": "stress"}, file)
+    for i in range(50):
+        with open(os.path.join(path, SUBDIRECTORY, "{{cookiecutter.project_slug}}", f"file{i}.txt"), "w") as file:
+            file.write(f"{i}\n" * 1000)
+    env = {**os.environ, "GIT_AUTHOR_NAME": "a3t", "GIT_AUTHOR_EMAIL": "a3t@localhost",
+           "GIT_COMMITTER_NAME": "a3t", "GIT_COMMITTER_EMAIL": "a3t@localhost"}
+    for args in (["init", "--quiet", "--initial-branch", "main"], ["add", "."], ["commit", "--quiet", "-m", "template"]):
+        subprocess.run(["git", *args], cwd=path, env=env, check=True)
+    return subprocess.run(["git", "rev-parse", "HEAD"], cwd=path, capture_output=True, text=True, check=True).stdout.strip()
+
+
+def tree_digest(path: str) -> str:
+    digest = hashlib.sha256()
+    for root, dirs, files in os.walk(path):
+        dirs.sort()
+        for name in sorted(files):
+            file_path = os.path.join(root, name)
+            digest.update(os.path.relpath(file_path, path).encode("utf-8"))
+            with open(file_path, "rb") as file:
+                digest.update(file.read())
+    return digest.hexdigest()
+
+
+def worker(args: tuple) -> dict:
+    worker_id, commit, strategy = args
+    from cli.utils.cache import cache_dir, load_json, store_json
+    from cli.utils.snapshots import get_snapshot, cached_file
+
+    path = get_snapshot(ORGANIZATION, REPOSITORY, "main", commit, strategy, SUBDIRECTORY)
+    content = cached_file(ORGANIZATION, REPOSITORY, commit, "cookiecutter.json", lambda: '{"project_slug": "stress"}')
+    shared = os.path.join(cache_dir("catalog"), "stress.json")
+    store_json(shared, {"worker": worker_id, "payload": "x" * 10000})
+    return {
+        "digest": tree_digest(os.path.join(path, SUBDIRECTORY)),
+        "ok": json.loads(content) == {"project_slug": "stress"} and load_json(shared) is not None,
+    }
+
+
+def main() -> int:
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 16
+    rounds = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+    base = tempfile.mkdtemp(prefix="a3t-stress-")
+    commit = make_repository(base)
+    repo_path = os.path.join(base, "repo")
+
+    # Workers inherit this environment: one shared cache, and github.com replaced by the local repo
+    os.environ["A3T_CACHE_DIR"] = os.path.join(base, "cache")
+    os.environ["GIT_CONFIG_COUNT"] = "1"
+    os.environ["GIT_CONFIG_KEY_0"] = f"url.file://{repo_path}.insteadOf"
+    os.environ["GIT_CONFIG_VALUE_0"] = f"https://github.com/{ORGANIZATION}/{REPOSITORY}.git"
+    os.environ["GIT_ALLOW_PROTOCOL"] = "file"
+    src = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    sys.path.insert(0, src)
+    os.environ["PYTHONPATH"] = os.pathsep.join(filter(None, [src, os.environ.get("PYTHONPATH")]))
+
+    from cli.utils.cache_index import cache_stats, verify_cache
+    from cli.utils.snapshots import _snapshot_key
+
+    expected = tree_digest(os.path.join(repo_path, SUBDIRECTORY))
+    failed = False
+    with multiprocessing.get_context("spawn").Pool(workers) as pool:
+        for strategy in STRATEGIES:
+            for _ in range(rounds):
+                results = pool.map(worker, [(i, commit, strategy) for i in range(workers)])
+                bad = [r for r in results if r["digest"] != expected or not r["ok"]]
+                if bad:
+                    print(f"{strategy}: {len(bad)}/{workers} workers saw a corrupted cache")
+                    failed = True
+            print(f"{strategy}: {workers} workers x {rounds} rounds done")
+
+    stats = cache_stats()
+    snapshots = stats["kinds"]["snapshots"]
+    # mirror, shallow and partial share one entry per commit, sparse has its own
+    entries = len({_snapshot_key(commit, strategy, SUBDIRECTORY) for strategy in STRATEGIES})
+    if snapshots["misses"] != entries:
+        print(f"expected {entries} snapshot fetches, got {snapshots['misses']}")
+        failed = True
+    problems = verify_cache()
+    if problems:
+        print(f"cache verify found problems: {problems}")
+        failed = True
+    print(f"snapshots: {snapshots['hits']} hits, {snapshots['misses']} misses; cache at {stats['path']}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
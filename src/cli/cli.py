@@ -1,16 +1,21 @@
 #!/usr/bin/env python3
+import sys
 import json
 import typer
 from rich.console import Console
 from rich.panel import Panel
-from rich.traceback import Traceback
 import os
+from typing import List, Optional
 # Import our modules
 from .utils import ui
-from .utils.template import get_templates
+from .utils.template import get_templates, load_catalog
 from .utils.template import TemplateClass
 from .utils.template.abs import GitHubAuthError
-from .utils.telemetry import send_telemetry
+from .utils.credentials import get_credentials
+from .utils.telemetry import send_telemetry, user_info
+from .utils.startup import Startup
+from .utils.tools import probe_tools
+from .utils.template import CATALOG_URL
 app = typer.Typer(help="A CLI tool to generate templates for A3 Data projects. Utilize o comando 'a3t' para gerar templates de projetos da A3 Data.")
 console = Console()
 
@@ -18,28 +23,94 @@ console = Console()
 @app.command("list")
 def list_templates(json_output: bool = typer.Option(False, "--json", help="Output as JSON")):
     """List available templates."""
-    templates_data = get_templates()
+    templates_data = load_catalog()
     if json_output:
-        # Assuming templates_data is a list of TemplateClass or dict-like objects
-        output = [t.config.__dict__ if hasattr(t, "config") else str(t) for t in templates_data]
+        output = [
+            {
+                **t.config.__dict__,
+                "accessible": t.remote.accessible if t.remote else None,
+                "head_commit": t.remote.commit if t.remote else None,
+            }
+            for t in templates_data
+        ]
         console.print(json.dumps(output, indent=2))
     else:
         ui.display_header("Templates disponíveis:")
         for idx, t in enumerate(templates_data):
-            console.print(f"[{idx}] {t.config.name} - {t.config.description}")
+            status = ""
+            if t.remote:
+                status = f" [dim]{t.remote.commit[:7]}[/dim]" if t.remote.accessible else " [red](sem acesso)[/red]"
+            console.print(f"[{idx}] {t.config.name} - {t.config.description}{status}")
+
+
+
+def _build_batch(template: TemplateClass, path: str, jobs: int, output_dir: str) -> None:
+    """Generate one project per line of `path`, printing one JSON result per line as each finishes"""
+    from .utils import batch
 
+    try:
+        batch_jobs = batch.read_jobs(path, output_dir, require_options=template.config.type == "cookiecutter")
+    except (OSError, ValueError) as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    failed = 0
+    for result in batch.run_batch(template, batch_jobs, jobs or batch.DEFAULT_JOBS):
+        # Plain print: rich would wrap and highlight the NDJSON lines
+        print(json.dumps(result), flush=True)
+        metadata = {
+            "organization": template.config.organization,
+            "repository": template.config.repository,
+            "branch": template.config.branch,
+        }
+        if result["status"] == "ok":
+            send_telemetry(template.config.name, metadata=metadata, code="TEMPLATE_GENERATED")
+        else:
+            failed += 1
+            send_telemetry(template.config.name, metadata={**metadata, "error": result["error"]}, code="ERROR_GENERATING_TEMPLATE")
+    if failed:
+        raise typer.Exit(1)
 
 
 @app.command("build")
 def build_template(
     template_id: int = typer.Option(..., "--template", "-t", help="ID do template (use 'a3t list' para ver os IDs)"),
-    options: str = typer.Option("", "--options", "-o", help="Opções do template em JSON"),
+    options: str = typer.Option("", "--options", "-o", help="Opções do template em JSON (sem perguntas)"),
     json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+    fetch: str = typer.Option("", "--fetch", help="Estratégia de download do template: mirror, shallow, partial, sparse ou archive"),
+    output_dir_option: str = typer.Option("", "--output-dir", "-d", help="Pasta onde o template será criado (sem perguntar)"),
+    batch_file: str = typer.Option("", "--batch", help='Arquivo JSONL com um projeto por linha: {"options": {...}, "output_dir": "..."}'),
+    jobs: int = typer.Option(0, "--jobs", "-j", help="Projetos gerados em paralelo com --batch (padrão: número de CPUs)"),
+    output_archive: str = typer.Option("", "--output-archive", help="Grava o projeto em um arquivo .tar.gz, .tar.zst, .tar ou .zip ('-' para stdout) em vez de uma pasta"),
+    archive_format: str = typer.Option("", "--archive-format", help="Formato do --output-archive: tar.gz, tar.zst, tar ou zip (padrão: pela extensão)"),
 ):
     """Build a template by ID and options."""
+    if output_archive == "-":
+        # The archive goes to stdout: everything else printed goes to stderr
+        sys.stdout = sys.stderr
+    try:
+        answers = json.loads(options) if options else None
+    except ValueError as e:
+        console.print(f"[red]--options não é um JSON válido: {e}[/red]")
+        raise typer.Exit(1)
+    try:
+        if fetch:
+            from .utils.fetch import resolve_strategy
+
+            resolve_strategy(fetch)
+        if output_archive:
+            from .utils import archive
+
+            if batch_file:
+                raise ValueError("--output-archive não pode ser usado com --batch.")
+            archive.archive_format(output_archive, archive_format)
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
     templates_data = get_templates()
     try:
         template: TemplateClass = templates_data[template_id]
+        if fetch:
+            template.config.fetch = fetch
         send_telemetry(template.config.name,
                        metadata={
                             "organization": template.config.organization,
@@ -53,12 +124,20 @@ def build_template(
     if not template.is_available():
         console.print(f"[red]Template não disponível ou não encontrado.[/red]")
         raise typer.Exit(1)
+    # Download the template while the user answers the prompts below
+    template.prefetch()
+    if batch_file:
+        _build_batch(template, batch_file, jobs, output_dir_option or ".")
+        return
     
     
     
     try:
-        template_options = template.get_template_options()
-        collected_data = ui.collect_template_inputs(template_options)
+        if answers is not None:
+            collected_data = answers
+        else:
+            template_options = template.get_template_options()
+            collected_data = ui.collect_template_inputs(template_options)
         template_config = template.encode_input(collected_data)
         console.print(template_config)
     except GitHubAuthError as e:
@@ -74,15 +153,24 @@ def build_template(
     
     try:
     
-        output_dir, success = ui.get_string_option(
-                "Em qual pasta vc gostaria de criar o template? (Pressione Enter para usar a pasta atual)",
-                default="./."
-            )
-        console.print(f"[bold]O template será criado na pasta:[/bold] { os.path.abspath(output_dir) }")
-        if not success:
-            raise KeyboardInterrupt
+        if output_archive:
+            with archive.open_archive(output_archive, archive_format) as writer:
+                template.build_archive(template_config, writer)
+            if output_archive != "-":
+                console.print(f"[bold]Projeto gravado em:[/bold] {os.path.abspath(output_archive)}")
+        else:
+            if output_dir_option:
+                output_dir, success = output_dir_option, True
+            else:
+                output_dir, success = ui.get_string_option(
+                    "Em qual pasta vc gostaria de criar o template? (Pressione Enter para usar a pasta atual)",
+                    default="./."
+                )
+            console.print(f"[bold]O template será criado na pasta:[/bold] { os.path.abspath(output_dir) }")
+            if not success:
+                raise KeyboardInterrupt
 
-        template.build(template_config, output_dir)
+            template.build(template_config, output_dir)
         
         send_telemetry(template.config.name,
                         metadata={
@@ -117,8 +205,230 @@ def build_template(
         raise typer.Exit(1)
 
 
+UPDATE_ACTIONS = {
+    "added": "[green]adicionado[/green]",
+    "updated": "[green]atualizado[/green]",
+    "merged": "[cyan]mesclado[/cyan]",
+    "conflict": "[red]conflito[/red]",
+    "removed": "[yellow]removido[/yellow]",
+    "kept": "[yellow]mantido (removido do template)[/yellow]",
+    "skipped": "[dim]ignorado[/dim]",
+}
+
+
+@app.command("update")
+def update_template(
+    path: str = typer.Argument(".", help="Pasta do projeto gerado pelo a3t"),
+    commit: str = typer.Option("", "--commit", help="Commit do template para o qual atualizar (padrão: o mais recente)"),
+    dry_run: bool = typer.Option(False, "--dry-run", help="Só mostra o que seria alterado"),
+    force: bool = typer.Option(False, "--force", help="Atualiza mesmo com alterações não commitadas no projeto"),
+    json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+):
+    """Update a generated project to a newer revision of its template."""
+    from .utils import update
+
+    try:
+        report = update.update_project(path, get_templates(), commit=commit, dry_run=dry_run, force=force)
+    except Exception as e:
+        console.print(f"[red]Falha ao atualizar o projeto: {e}[/red]")
+        raise typer.Exit(1)
+    if not dry_run and report["changes"]:
+        send_telemetry(report["template"], metadata={"from": report["from"], "to": report["to"], "conflicts": report["conflicts"]}, code="TEMPLATE_UPDATED")
+    if json_output:
+        console.print(json.dumps(report, indent=2))
+    elif report["from"] == report["to"]:
+        console.print(f"O projeto já está no commit {report['to'][:7]} do template {report['template']}.")
+    else:
+        ui.display_header(f"{report['template']}: {report['from'][:7]} → {report['to'][:7]}" + (" (dry run)" if dry_run else ""))
+        for change in report["changes"]:
+            console.print(f"{UPDATE_ACTIONS[change['action']]} {change['path']}")
+        if not report["changes"]:
+            console.print("Nenhum arquivo do projeto mudou entre as duas versões do template.")
+        if report["conflicts"]:
+            console.print(f"[red]{report['conflicts']} arquivos com conflitos: resolva os marcadores (ou os arquivos {update.CONFLICT_SUFFIX}) antes de commitar.[/red]")
+    if report["conflicts"]:
+        raise typer.Exit(1)
+
+
+@app.command("serve")
+def serve_templates(
+    host: str = typer.Option("127.0.0.1", "--host", help="Endereço em que o serviço escuta"),
+    port: int = typer.Option(8765, "--port", "-p", help="Porta do serviço (0 para escolher uma livre)"),
+    workers: int = typer.Option(0, "--workers", "-w", help="Gerações em paralelo (padrão: $A3T_SERVE_WORKERS ou número de CPUs)"),
+):
+    """Serve a local HTTP API to list templates, get their options and build them."""
+    from .utils import serve
+
+    def ready(url: str, token: str) -> None:
+        console.print(f"[bold]Servindo em[/bold] {url} [dim](Ctrl+C para parar)[/dim]")
+        # Plain print: rich could wrap the token
+        print(f"Token: {token}", flush=True)
+
+    console.print("Carregando templates e iniciando os workers...")
+    try:
+        serve.serve(host, port, workers, ready=ready)
+    except Exception as e:
+        console.print(f"[red]Falha ao iniciar o serviço: {e}[/red]")
+        raise typer.Exit(1)
+
+
+cache_app = typer.Typer(help="Gerencia o cache local de templates (catálogo, snapshots, mirrors).")
+app.add_typer(cache_app, name="cache")
+
+
+@cache_app.command("stats")
+def cache_stats(json_output: bool = typer.Option(False, "--json", help="Output as JSON")):
+    """Show cache size, entries and hit rate per area."""
+    from .utils import cache_index
+
+    stats = cache_index.cache_stats()
+    if json_output:
+        console.print(json.dumps(stats, indent=2))
+        return
+    ui.display_header(f"Cache em {stats['path']}:")
+    console.print(f"Tamanho: {cache_index.format_size(stats['size'])} de {cache_index.format_size(stats['max_size'])}")
+    for kind, info in stats["kinds"].items():
+        hit_rate = f"{info['hit_rate']:.0%}" if info["hit_rate"] is not None else "-"
+        console.print(
+            f"  {kind:<10} {info['entries']:>4} entradas  {cache_index.format_size(info['size']):>7}  "
+            f"acertos {info['hits']}/{info['hits'] + info['misses']} ({hit_rate})"
+        )
+    if stats["legacy_cookiecutters_size"]:
+        console.print(
+            f"[dim]~/.cookiecutters ocupa {cache_index.format_size(stats['legacy_cookiecutters_size'])} "
+            "(use 'a3t cache clear --cookiecutters' para remover)[/dim]"
+        )
+
+
+@cache_app.command("prune")
+def cache_prune(
+    max_size: str = typer.Option("", "--max-size", help="Tamanho máximo, ex.: 500M ou 2G (padrão: $A3T_CACHE_MAX_SIZE ou 2G)"),
+    json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+):
+    """Evict least recently used entries until the cache fits its size cap."""
+    from .utils import cache_index
+
+    try:
+        limit = cache_index.parse_size(max_size) if max_size else None
+    except ValueError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    evicted = cache_index.prune_cache(limit)
+    if json_output:
+        console.print(json.dumps({"evicted": evicted}, indent=2))
+        return
+    for key in evicted:
+        console.print(f"[dim]removido[/dim] {key}")
+    console.print(f"{len(evicted)} entradas removidas.")
+
+
+@cache_app.command("clear")
+def cache_clear(
+    cookiecutters: bool = typer.Option(False, "--cookiecutters", help="Também remove ~/.cookiecutters"),
+    json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+):
+    """Delete every cached catalog, snapshot and mirror."""
+    from .utils import cache_index
+
+    freed = cache_index.clear_cache(cookiecutters=cookiecutters)
+    if json_output:
+        console.print(json.dumps({"freed": freed}, indent=2))
+        return
+    console.print(f"Cache limpo, {cache_index.format_size(freed)} liberados.")
+
+
+@cache_app.command("verify")
+def cache_verify(json_output: bool = typer.Option(False, "--json", help="Output as JSON")):
+    """Check cached entries, removing corrupted ones and leftover temporary files."""
+    from .utils import cache_index
+
+    problems = cache_index.verify_cache()
+    if json_output:
+        console.print(json.dumps({"problems": problems}, indent=2))
+        return
+    for problem in problems:
+        console.print(f"[yellow]{problem['entry']}[/yellow]: {problem['problem']}")
+    console.print("Cache íntegro." if not problems else f"{len(problems)} problemas corrigidos.")
+
+
+bundle_app = typer.Typer(help=(
+    "Exporta e importa bundles para gerar templates sem acesso ao GitHub. "
+    "Templates Nix ainda precisam de rede ou do store do Nix: o <nixpkgs> e os inputs do flake não vão no bundle. "
+    "O código é usado com qualquer --fetch, mas um bundle exportado com `subdirectory` "
+    "(estratégias sparse e archive) só contém essa pasta do repositório."
+))
+app.add_typer(bundle_app, name="bundle")
+
+
+@bundle_app.command("export")
+def bundle_export(
+    output: str = typer.Argument("a3t-bundle.tar.gz", help="Arquivo .tar.gz a ser criado"),
+    template_ids: Optional[List[int]] = typer.Option(None, "--template", "-t", help="IDs dos templates a incluir (padrão: todos)"),
+    json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+):
+    """Export the catalog, template options and sources into an offline bundle."""
+    from .utils import bundle, cache_index
+
+    templates = load_catalog()
+    if template_ids:
+        try:
+            templates = [templates[template_id] for template_id in template_ids]
+        except IndexError:
+            console.print(f"[red]Template ID inválido: {template_ids}[/red]")
+            raise typer.Exit(1)
+    try:
+        with console.status("Baixando templates..."):
+            manifest = bundle.export_bundle(output, CATALOG_URL, templates)
+    except RuntimeError as e:
+        console.print(f"[red]{e}[/red]")
+        raise typer.Exit(1)
+    failed = [entry for entry in manifest["templates"] if "error" in entry]
+    if json_output:
+        console.print(json.dumps({"bundle": output, "size": os.path.getsize(output), **manifest}, indent=2))
+    else:
+        for entry in manifest["templates"]:
+            if "error" in entry:
+                console.print(f"[red]✗[/red] {entry['name']}: {entry['error']}")
+            else:
+                console.print(f"[green]✓[/green] {entry['name']} [dim]{entry['commit'][:7]}[/dim]")
+        console.print(f"Bundle criado em {output} ({cache_index.format_size(os.path.getsize(output))}).")
+    if failed:
+        raise typer.Exit(1)
+
+
+@bundle_app.command("import")
+def bundle_import(
+    path: str = typer.Argument(..., help="Bundle criado com 'a3t bundle export'"),
+    json_output: bool = typer.Option(False, "--json", help="Output as JSON"),
+):
+    """Import an offline bundle into the local cache."""
+    from .utils import bundle
+
+    try:
+        manifest = bundle.import_bundle(path, force=True)
+    except (OSError, RuntimeError) as e:
+        console.print(f"[red]Falha ao importar o bundle: {e}[/red]")
+        raise typer.Exit(1)
+    templates = [entry for entry in manifest["templates"] if "error" not in entry]
+    if json_output:
+        console.print(json.dumps(manifest, indent=2))
+        return
+    console.print(f"{len(templates)} templates importados. Use 'A3T_OFFLINE=1 a3t' ou 'a3t --bundle {path}' sem acesso à rede.")
+
+
 @app.callback(invoke_without_command=True)
-def main(ctx: typer.Context):
+def main(
+    ctx: typer.Context,
+    bundle_path: str = typer.Option("", "--bundle", help="Usa um bundle offline ('a3t bundle export') em vez do GitHub"),
+):
+    try:
+        if bundle_path:
+            from .utils import bundle
+
+            bundle.use_bundle(bundle_path)
+    except (OSError, RuntimeError) as e:
+        console.print(f"[red]Falha ao usar o bundle: {e}[/red]")
+        raise typer.Exit(1)
     if ctx.invoked_subcommand is not None:
         return
     """A3 Template Generator CLI"""
@@ -130,14 +440,23 @@ def main(ctx: typer.Context):
  /_/   \\_\\____/    |_|\\___|_| |_| |_| .__/|_|\\__,_|\\__\\___||___/
                                     |_|
 """
+    # Catalog, credentials, telemetry info and tool checks load while the banner prints
+    startup = Startup(
+        templates=load_catalog,
+        credentials=get_credentials,
+        user_info=user_info,
+        tools=probe_tools,
+    )
     try:
         console.print(title)
         ui.display_header("Um gerador de templates para acelerar o eu.A3 para sugestões e melhorias, abra uma issue no repositório da CLI, ou do template especifico.")
         console.print("[bold] GitHub:[/bold] https://github.com/A3Data/templates-cli/issues")
-        # Get available templates with a spinner
-        templates_data = get_templates()
+        with console.status("Carregando templates..."):
+            templates_data = startup.result("templates")
         template:TemplateClass = ui.choose_item(templates_data, "template")
         assert template.is_available(), "Template não disponível ou não encontrado."
+        # Download the template while the user answers the prompts below
+        template.prefetch()
 
         send_telemetry(template.config.name, 
                        metadata={
@@ -0,0 +1,210 @@
+import io
+import os
+import sys
+import stat
+import time
+import shutil
+import tarfile
+import contextlib
+from typing import BinaryIO
+from .cache import temp_path
+
+# Archive formats by file extension; stdout ("-") defaults to tar.gz
+ARCHIVE_FORMATS = {".tar.gz": "tar.gz", ".tgz": "tar.gz", ".tar.zst": "tar.zst", ".tar": "tar", ".zip": "zip"}
+DEFAULT_ARCHIVE_FORMAT = "tar.gz"
+# Faster than the default 9, barely larger (like bundle export)
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+COPY_BUFFER = 1 << 20
+
+
+def archive_format(target: str, fmt: str = "") -> str:
+    """Format to write `target` in: `fmt` when given, else from the extension"""
+    formats = set(ARCHIVE_FORMATS.values())
+    if fmt:
+        if fmt not in formats:
+            raise ValueError(f"Formato de arquivo desconhecido: {fmt} (use {', '.join(sorted(formats))})")
+        return fmt
+    if target == "-":
+        return DEFAULT_ARCHIVE_FORMAT
+    for extension, candidate in ARCHIVE_FORMATS.items():
+        if target.endswith(extension):
+            return candidate
+    raise ValueError(f"Extensão não reconhecida em {target} (use {', '.join(ARCHIVE_FORMATS)})")
+
+
+def _zstd_writer(fileobj: BinaryIO):
+    try:
+        import zstandard
+    except ImportError:
+        raise RuntimeError("Para gerar .tar.zst instale o pacote zstandard (pip install zstandard).")
+    return zstandard.ZstdCompressor(level=ZSTD_LEVEL).stream_writer(fileobj, closefd=False)
+
+
+class ArchiveWriter:
+    """Streaming tar (plain, gzip or zstd) or zip writer.
+
+    Members are written as they are added and never seeked back to, so `fileobj`
+    can be a pipe or stdout. Every member gets the time the archive was started.
+    """
+
+    def __init__(self, fileobj: BinaryIO, fmt: str):
+        self.format = fmt
+        self.mtime = time.time()
+        self.files = 0
+        self._dirs = set()
+        self._zip = self._tar = self._stream = None
+        if fmt == "zip":
+            import zipfile
+
+            self._zip = zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED, compresslevel=GZIP_LEVEL)
+            return
+        if fmt == "tar.gz":
+            import gzip
+
+            self._stream = gzip.GzipFile(fileobj=fileobj, mode="wb", compresslevel=GZIP_LEVEL, mtime=int(self.mtime))
+        elif fmt == "tar.zst":
+            self._stream = _zstd_writer(fileobj)
+        self._tar = tarfile.open(fileobj=self._stream or fileobj, mode="w|", format=tarfile.PAX_FORMAT)
+
+    def _zip_info(self, name: str, mode: int):
+        import zipfile
+
+        info = zipfile.ZipInfo(name, date_time=time.localtime(self.mtime)[:6])
+        info.external_attr = mode << 16
+        info.compress_type = zipfile.ZIP_DEFLATED
+        return info
+
+    def _tar_info(self, name: str, mode: int, size: int = 0, kind: bytes = tarfile.REGTYPE) -> tarfile.TarInfo:
+        info = tarfile.TarInfo(name)
+        info.mode, info.size, info.mtime, info.type = mode, size, int(self.mtime), kind
+        return info
+
+    def add_dir(self, name: str, mode: int = 0o755) -> None:
+        name = name.rstrip("/")
+        if not name or name in self._dirs:
+            return
+        self._dirs.add(name)
+        if self._zip:
+            info = self._zip_info(name + "/", stat.S_IFDIR | mode)
+            info.external_attr |= 0x10  # MS-DOS directory flag
+            self._zip.writestr(info, b"")
+        else:
+            self._tar.addfile(self._tar_info(name, mode, kind=tarfile.DIRTYPE))
+
+    def add_bytes(self, name: str, data: bytes, mode: int = 0o644) -> None:
+        self.files += 1
+        if self._zip:
+            self._zip.writestr(self._zip_info(name, stat.S_IFREG | mode), data)
+        else:
+            self._tar.addfile(self._tar_info(name, mode, len(data)), io.BytesIO(data))
+
+    def add_stream(self, name: str, fileobj: BinaryIO, size: int, mode: int = 0o644) -> None:
+        """Add `size` bytes read from `fileobj`, copied in chunks"""
+        self.files += 1
+        if self._zip:
+            info = self._zip_info(name, stat.S_IFREG | mode)
+            info.file_size = size  # lets zipfile pick zip64 up front, the output isn't seekable
+            with self._zip.open(info, "w") as target:
+                shutil.copyfileobj(fileobj, target, COPY_BUFFER)
+        else:
+            self._tar.addfile(self._tar_info(name, mode, size), fileobj)
+
+    def add_file(self, name: str, path: str, mode: int = None) -> None:
+        """Add the file at `path` (following symlinks), with its own mode unless `mode` is given"""
+        with open(path, "rb") as file:
+            st = os.fstat(file.fileno())
+            self.add_stream(name, file, st.st_size, stat.S_IMODE(st.st_mode) if mode is None else mode)
+
+    def add_symlink(self, name: str, target: str) -> None:
+        if self._zip:
+            # Info-ZIP convention: the link target as content, with a symlink mode
+            self.add_bytes(name, target.encode("utf-8"), stat.S_IFLNK | 0o777)
+        else:
+            info = self._tar_info(name, 0o777, kind=tarfile.SYMTYPE)
+            info.linkname = target
+            self._tar.addfile(info)
+
+    def add_tree(self, root: str, prefix: str, symlinks: bool = True) -> None:
+        """Add the directory `root` as `prefix`, with its modes.
+
+        Symlinks are added as symlinks, like fastcopy.copy_tree(symlinks=True) keeps
+        them. With `symlinks` False they are followed, like copy_tree() does by
+        default; a directory reached twice is only added once, so link cycles end.
+        """
+        seen = set()
+        for directory, dirs, files in os.walk(root, followlinks=not symlinks):
+            st = os.stat(directory)
+            if (st.st_dev, st.st_ino) in seen:
+                dirs[:] = []
+                continue
+            seen.add((st.st_dev, st.st_ino))
+            dirs.sort()
+            relative = os.path.relpath(directory, root)
+            name = prefix if relative == "." else f"{prefix}/{relative}"
+            self.add_dir(name, stat.S_IMODE(st.st_mode))
+            # Not descended into without following links: added as entries
+            linked_dirs = [d for d in dirs if symlinks and os.path.islink(os.path.join(directory, d))]
+            for file in sorted(files + linked_dirs):
+                path = os.path.join(directory, file)
+                if symlinks and os.path.islink(path):
+                    self.add_symlink(f"{name}/{file}", os.readlink(path))
+                else:
+                    self.add_file(f"{name}/{file}", path)
+
+    def add_tar_stream(self, fileobj: BinaryIO, prefix: str = "") -> None:
+        """Copy every member of an uncompressed tar stream (like `git archive` output), under `prefix`"""
+        with tarfile.open(fileobj=fileobj, mode="r|") as source:
+            for member in source:
+                name = f"{prefix}{member.name}"
+                if member.isdir():
+                    self.add_dir(name, stat.S_IMODE(member.mode))
+                elif member.issym():
+                    self.add_symlink(name, member.linkname)
+                elif member.isreg():
+                    self.add_stream(name, source.extractfile(member), member.size, stat.S_IMODE(member.mode))
+
+    def close(self) -> None:
+        if self._zip:
+            self._zip.close()
+            return
+        self._tar.close()
+        if self._stream is not None:
+            self._stream.close()
+
+
+@contextlib.contextmanager
+def open_archive(target: str, fmt: str = ""):
+    """ArchiveWriter for `target`: a file path, or "-" for stdout.
+
+    Files are written to a temporary sibling and renamed when complete, so a failed
+    build leaves nothing behind. For stdout the archive is written to a duplicate
+    of file descriptor 1, which points at stderr until the archive is done: hooks
+    and other subprocesses inherit fd 1, and their output must not end up inside
+    the archive. Callers still redirect sys.stdout for their own output.
+    """
+    fmt = archive_format(target, fmt)
+    if target == "-":
+        sys.__stdout__.flush()
+        saved = os.dup(1)
+        os.dup2(2, 1)
+        try:
+            with open(saved, "wb", buffering=COPY_BUFFER, closefd=False) as stdout:
+                writer = ArchiveWriter(stdout, fmt)
+                yield writer
+                writer.close()
+        finally:
+            sys.__stdout__.flush()
+            os.dup2(saved, 1)
+            os.close(saved)
+        return
+    tmp_path = temp_path(os.path.abspath(target))
+    try:
+        with open(tmp_path, "wb") as file:
+            writer = ArchiveWriter(file, fmt)
+            yield writer
+            writer.close()
+        os.replace(tmp_path, target)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
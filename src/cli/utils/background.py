@@ -0,0 +1,23 @@
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable
+
+
+def run_in_background(func: Callable[..., Any], *args: Any) -> Future:
+    """Run `func(*args)` on a daemon thread and return a Future with its result.
+
+    Unlike a ThreadPoolExecutor, the thread doesn't keep the process alive at exit,
+    so cancelling the CLI never waits for speculative work to finish.
+    """
+    future: Future = Future()
+
+    def runner() -> None:
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, name=f"a3t-{getattr(func, '__name__', 'task')}", daemon=True).start()
+    return future
@@ -0,0 +1,74 @@
+import os
+import json
+import time
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator
+
+# Parallel generations when --jobs isn't given
+DEFAULT_JOBS = os.cpu_count() or 1
+
+
+def read_jobs(path: str, output_dir: str = ".", require_options: bool = False) -> list[dict]:
+    """Read an answers file: one JSON object per line, `{"options": {...}, "output_dir": "..."}`.
+
+    `output_dir` is optional and relative to `output_dir`; `id` names the job in the
+    results (the line number by default). Blank lines and lines starting with # are skipped.
+    With `require_options`, lines without answers are rejected: cookiecutter would
+    prompt for them, and the worker processes have no terminal.
+    """
+    jobs = []
+    with open(path, "r", encoding="utf-8") as file:
+        for number, line in enumerate(file, start=1):
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            try:
+                job = json.loads(line)
+            except ValueError as e:
+                raise ValueError(f"{path}:{number}: JSON inválido ({e})")
+            if not isinstance(job, dict) or not isinstance(job.get("options", {}), dict):
+                raise ValueError(f'{path}:{number}: esperado {{"options": {{...}}, "output_dir": "..."}}')
+            if require_options and not job.get("options"):
+                raise ValueError(f'{path}:{number}: informe ao menos uma resposta em "options" (as demais usam o padrão do template)')
+            jobs.append({
+                "id": job.get("id", number),
+                "options": job.get("options", {}),
+                "output_dir": os.path.join(output_dir, job.get("output_dir", "")),
+            })
+    return jobs
+
+
+def _init_worker() -> None:
+    # Jobs already run in parallel: each one renders in its own process only
+    os.environ["A3T_RENDER_WORKERS"] = "1"
+
+
+def _build_job(template, job: dict) -> dict:
+    """Run one generation; executed in a worker process"""
+    start = time.perf_counter()
+    result = {"id": job["id"], "output_dir": os.path.abspath(job["output_dir"])}
+    try:
+        os.makedirs(job["output_dir"], exist_ok=True)
+        template.build(template.encode_input(job["options"]), job["output_dir"])
+        result["status"] = "ok"
+    except Exception as e:
+        result.update(status="error", error=str(e))
+    result["seconds"] = round(time.perf_counter() - start, 3)
+    return result
+
+
+def run_batch(template, jobs: list[dict], workers: int = DEFAULT_JOBS) -> Iterator[dict]:
+    """Build `template` once per job on a process pool, yielding each result as it finishes.
+
+    The template sources are resolved once here (commit and snapshot), so workers
+    only render from the local snapshot. Workers are started with spawn: the CLI
+    already runs background threads, which don't survive a fork safely.
+    """
+    template.prefetch()
+    template._sources()  # wait for the snapshot, leaving nothing unpicklable behind
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=max(1, min(workers, len(jobs))), mp_context=context, initializer=_init_worker) as executor:
+        futures = [executor.submit(_build_job, template, job) for job in jobs]
+        for future in as_completed(futures):
+            yield future.result()
@@ -0,0 +1,177 @@
+import io
+import os
+import sys
+import json
+import time
+import shutil
+import tarfile
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .cache import cache_dir, load_json, temp_path
+from .cache_index import record_access
+from .catalog import _catalog_cache_path
+from .snapshots import cached_file_path, remember_commit
+
+BUNDLE_VERSION = 1
+MANIFEST_NAME = "manifest.json"
+# Templates fetched at the same time while exporting
+EXPORT_WORKERS = 8
+
+
+def _export_template(template) -> dict:
+    """Fetch everything `template` needs to be built offline into the cache"""
+    config = template.config
+    entry = {
+        "name": config.name,
+        "organization": config.organization,
+        "repository": config.repository,
+        "branch": config.branch,
+    }
+    try:
+        entry["commit"] = template.resolved_commit()
+        snapshot = template.snapshot()
+        entry["snapshot"] = os.path.relpath(snapshot, cache_dir())
+        # How the tree was fetched: builds offline reuse it under any --fetch (see snapshots.get_snapshot)
+        metadata = load_json(f"{snapshot}.json") or {}
+        entry["strategy"], entry["subdirectory"] = metadata.get("strategy", ""), metadata.get("subdirectory", "")
+    except Exception as e:
+        entry["error"] = str(e)
+        return entry
+    # Nix templates and templates without an option file are built with defaults
+    try:
+        template.get_template_options()
+        options_path = cached_file_path(config.organization, config.repository, entry["commit"], config.configPath)
+        entry["options"] = os.path.relpath(options_path, cache_dir())
+    except Exception:
+        pass
+    return entry
+
+
+def export_bundle(output: str, catalog_url: str, templates: list, workers: int = EXPORT_WORKERS) -> dict:
+    """Write the catalog, option files and snapshots of `templates` into a tar.gz bundle.
+
+    Templates are fetched concurrently (through the cache, so what is already cached
+    isn't downloaded again). Each one is taken at its pinned commit, or at the
+    current tip of its branch. Returns the bundle manifest; templates that could
+    not be fetched are listed with an `error` and left out.
+    """
+    catalog_path = _catalog_cache_path(catalog_url)
+    if not os.path.exists(catalog_path):
+        raise RuntimeError("Catálogo de templates não encontrado no cache.")
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        entries = list(executor.map(_export_template, templates))
+    manifest = {
+        "version": BUNDLE_VERSION,
+        "created_at": time.time(),
+        "catalog_url": catalog_url,
+        "catalog": os.path.relpath(catalog_path, cache_dir()),
+        "templates": entries,
+    }
+
+    members = [manifest["catalog"]]
+    for entry in entries:
+        if "snapshot" in entry:
+            members += [entry["snapshot"], f"{entry['snapshot']}.json"]
+        if "options" in entry:
+            members.append(entry["options"])
+
+    tmp_path = temp_path(os.path.abspath(output))
+    try:
+        # Lower compression than tarfile's default 9: much faster, barely larger
+        with tarfile.open(tmp_path, "w:gz", compresslevel=6) as archive:
+            data = json.dumps(manifest, indent=2).encode("utf-8")
+            info = tarfile.TarInfo(MANIFEST_NAME)
+            info.size, info.mtime = len(data), int(manifest["created_at"])
+            archive.addfile(info, io.BytesIO(data))
+            for member in dict.fromkeys(members):
+                path = os.path.join(cache_dir(), member)
+                if os.path.exists(path):
+                    archive.add(path, arcname=member)
+        os.replace(tmp_path, output)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    return manifest
+
+
+def read_manifest(path: str) -> dict:
+    """Read only the manifest, which export writes as the first member of the bundle"""
+    with tarfile.open(path, "r|gz") as archive:
+        for member in archive:
+            if member.name == MANIFEST_NAME:
+                manifest = json.load(archive.extractfile(member))
+                if manifest.get("version") != BUNDLE_VERSION:
+                    raise RuntimeError(f"Versão de bundle não suportada: {manifest.get('version')}")
+                return manifest
+            break
+    raise RuntimeError(f"{path} não é um bundle do a3t.")
+
+
+def _is_imported(manifest: dict) -> bool:
+    paths = [manifest["catalog"]] + [entry["snapshot"] for entry in manifest["templates"] if "snapshot" in entry]
+    return all(os.path.exists(os.path.join(cache_dir(), path)) for path in paths)
+
+
+def _extract(path: str, manifest: dict) -> None:
+    root = cache_dir()
+    staging = temp_path(os.path.join(root, "bundle"))
+    extract_kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+    try:
+        with tarfile.open(path, "r|gz") as archive:
+            for member in archive:
+                target = os.path.realpath(os.path.join(staging, member.name))
+                if os.path.commonpath([os.path.realpath(staging), target]) != os.path.realpath(staging):
+                    raise RuntimeError(f"Caminho inválido no bundle: {member.name}")
+                archive.extract(member, staging, **extract_kwargs)
+
+        # (cache kind, path, replace an existing entry)
+        entries = [("catalog", manifest["catalog"], True)]
+        for entry in manifest["templates"]:
+            if "snapshot" in entry:
+                entries += [("snapshots", entry["snapshot"], False), (None, f"{entry['snapshot']}.json", False)]
+            if "options" in entry:
+                entries.append(("files", entry["options"], False))
+        for kind, relpath, replace in entries:
+            source, target = os.path.join(staging, relpath), os.path.join(root, relpath)
+            if not os.path.exists(source) or (os.path.exists(target) and not replace):
+                continue
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            try:
+                os.replace(source, target)
+            except OSError:
+                if not os.path.exists(target):  # else another process imported it first
+                    raise
+            if kind:
+                record_access(kind, target, hit=False, origin=f"bundle:{os.path.basename(path)}")
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+
+def import_bundle(path: str, force: bool = False) -> dict:
+    """Copy a bundle into the cache, so catalog, options and builds are served from it.
+
+    Snapshots already in the cache are kept (entries are immutable); the catalog
+    is replaced by the bundle's. Nothing is extracted when every entry of the
+    bundle is already cached, unless `force`. Returns the bundle manifest.
+    """
+    manifest = read_manifest(path)
+    if force or not _is_imported(manifest):
+        _extract(path, manifest)
+    # Branch templates resolve to the bundled commit when GitHub can't be reached
+    for entry in manifest["templates"]:
+        if "commit" in entry:
+            remember_commit(entry["organization"], entry["repository"], entry["branch"], entry["commit"])
+    return manifest
+
+
+def use_bundle(path: Optional[str]) -> None:
+    """Import `path` (if needed) and switch the CLI to offline mode, for `--bundle`"""
+    if not path:
+        return
+    if not os.path.exists(path):
+        raise RuntimeError(f"Bundle não encontrado: {path}")
+    manifest = import_bundle(path)
+    os.environ["A3T_OFFLINE"] = "1"
+    age = int((time.time() - manifest["created_at"]) / 86400)
+    print(f"\033[93mModo offline: usando o bundle {os.path.basename(path)} ({age} dias).\033[0m", file=sys.stderr)
@@ -0,0 +1,51 @@
+import os
+import json
+from typing import Any, Optional
+
+
+def cache_dir(*parts: str) -> str:
+    """Return (and create) a directory inside the a3t user cache dir.
+
+    Uses $A3T_CACHE_DIR when set, otherwise $XDG_CACHE_HOME/a3t (~/.cache/a3t).
+    """
+    base = os.environ.get("A3T_CACHE_DIR")
+    if not base:
+        xdg = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+        base = os.path.join(xdg, "a3t")
+    path = os.path.join(base, *parts)
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def load_json(path: str) -> Optional[Any]:
+    """Read a JSON cache file, returning None if it is missing or corrupt"""
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def temp_path(path: str) -> str:
+    """Unique sibling of `path` to write into before renaming it into place.
+
+    Unique per process and thread, so concurrent writers of the same entry never
+    share a temporary file. `a3t cache verify` removes the ones left by crashes.
+    """
+    return f"{path}.{os.getpid()}-{os.urandom(4).hex()}.tmp"
+
+
+def store_json(path: str, data: Any) -> None:
+    """Write a JSON cache file, replacing the previous one in a single rename.
+
+    Readers never see a partial file, so they don't need to take any lock.
+    """
+    tmp_path = temp_path(path)
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
@@ -0,0 +1,281 @@
+import os
+import re
+import glob
+import time
+import atexit
+import shutil
+import threading
+import subprocess
+from collections import Counter
+from typing import Optional
+from .cache import cache_dir, load_json, store_json, temp_path
+from .filelock import file_lock
+
+# Total size the tracked cache entries may use before the least recently used are evicted
+DEFAULT_MAX_SIZE = "2G"
+# Cache areas managed by `a3t cache`; the telemetry spool is not a cache and is left alone
+CACHE_KINDS = ("catalog", "graphql", "refs", "files", "snapshots", "mirrors", "jinja", "renders")
+LEGACY_COOKIECUTTERS_DIR = os.path.expanduser("~/.cookiecutters")
+# Temporary fetch directories older than this are considered abandoned
+STALE_TMP_AGE = 60 * 60
+# Automatic eviction never removes entries used this recently: another build may
+# still be reading them, since readers of immutable entries take no lock
+EVICTION_GRACE = 10 * 60
+# A hit rewrites the index only if the entry's last access is older than this;
+# kept below EVICTION_GRACE so entries in use are still never evicted
+ACCESS_REFRESH = EVICTION_GRACE // 2
+
+_SIZE_RE = re.compile(r"^\s*(\d+(?:\.\d+)?)\s*([KMGT]?)B?\s*$", re.IGNORECASE)
+
+
+def parse_size(value: str) -> int:
+    """Parse sizes like "500M", "2G" or "1048576" into bytes"""
+    match = _SIZE_RE.match(value)
+    if not match:
+        raise ValueError(f"Tamanho inválido: {value}")
+    number, unit = match.groups()
+    return int(float(number) * 1024 ** " KMGT".index(unit.upper() or " "))
+
+
+def format_size(size: float) -> str:
+    for unit in ("B", "K", "M", "G"):
+        if size < 1024:
+            return f"{size:.0f}{unit}" if unit == "B" else f"{size:.1f}{unit}"
+        size /= 1024
+    return f"{size:.1f}T"
+
+
+def max_cache_size() -> int:
+    return parse_size(os.environ.get("A3T_CACHE_MAX_SIZE", DEFAULT_MAX_SIZE))
+
+
+def disk_usage(path: str) -> int:
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for root, _, files in os.walk(path):
+        for name in files:
+            try:
+                total += os.lstat(os.path.join(root, name)).st_size
+            except OSError:
+                pass
+    return total
+
+
+def _index_path() -> str:
+    return os.path.join(cache_dir(), "index.json")
+
+
+def _load_index() -> dict:
+    index = load_json(_index_path()) or {}
+    index.setdefault("entries", {})
+    index.setdefault("counters", {})
+    return index
+
+
+# Hits not yet written to the index (see record_access) and the last access of each
+# entry as last seen by this process
+_pending_hits: Counter = Counter()
+_last_access: Optional[dict] = None
+_access_lock = threading.Lock()
+_flush_registered = False
+
+
+def _store_index(index: dict) -> None:
+    """Write the index, with the hits counted since the last write. Call with the index lock held"""
+    global _last_access
+    with _access_lock:
+        for kind, hits in _pending_hits.items():
+            index["counters"].setdefault(kind, {"hits": 0, "misses": 0})["hits"] += hits
+        _pending_hits.clear()
+        _last_access = {key: entry["last_access"] for key, entry in index["entries"].items()}
+    store_json(_index_path(), index)
+
+
+def _defer_hit(kind: str, key: str, now: float) -> bool:
+    """Count a hit in memory if the entry's last access is recent enough to be left as is"""
+    global _last_access, _flush_registered
+    with _access_lock:
+        if _last_access is None:
+            # Readers don't need the lock: the index is replaced in a single rename
+            entries = (load_json(_index_path()) or {}).get("entries", {})
+            _last_access = {key: entry["last_access"] for key, entry in entries.items()}
+        if now - _last_access.get(key, 0) >= ACCESS_REFRESH:
+            return False
+        _pending_hits[kind] += 1
+        if not _flush_registered:
+            atexit.register(flush_hits)
+            _flush_registered = True
+    return True
+
+
+def flush_hits() -> None:
+    """Write the hits counted in memory to the index"""
+    if not _pending_hits:
+        return
+    with file_lock(f"{_index_path()}.lock"):
+        _store_index(_load_index())
+
+
+def _remove_entry(key: str) -> None:
+    path = os.path.join(cache_dir(), key)
+    # Rename first so no reader ever finds a half-deleted entry at its key
+    trash_path = temp_path(path)
+    try:
+        os.replace(path, trash_path)
+    except FileNotFoundError:
+        pass
+    if os.path.isdir(trash_path):
+        shutil.rmtree(trash_path, ignore_errors=True)
+    elif os.path.exists(trash_path):
+        os.remove(trash_path)
+    # Snapshots keep their metadata in a sibling file
+    if os.path.exists(f"{path}.json"):
+        os.remove(f"{path}.json")
+
+
+def record_access(kind: str, path: str, hit: bool, origin: str = "", changed: Optional[bool] = None) -> None:
+    """Count a cache hit/miss and refresh the entry's last access, size and origin.
+
+    Entries that were (re)written (on a miss, or `changed` like an updated mirror)
+    get their size measured again; if the cache then exceeds its size cap, the
+    least recently used entries are evicted. Plain hits on an entry accessed less
+    than ACCESS_REFRESH seconds ago only count in memory, and are written with the
+    next index update or at exit, so lookups don't take the index lock each time.
+    """
+    if changed is None:
+        changed = not hit
+    key = os.path.relpath(path, cache_dir())
+    now = time.time()
+    if hit and not changed and _defer_hit(kind, key, now):
+        return
+    with file_lock(f"{_index_path()}.lock"):
+        index = _load_index()
+        counters = index["counters"].setdefault(kind, {"hits": 0, "misses": 0})
+        counters["hits" if hit else "misses"] += 1
+        entry = index["entries"].get(key)
+        if entry is None or changed:
+            entry = {
+                "kind": kind,
+                "origin": origin or (entry or {}).get("origin", ""),
+                "created": (entry or {}).get("created", now),
+                "size": disk_usage(path),
+            }
+        entry["last_access"] = now
+        index["entries"][key] = entry
+        evicted = _evict(index, max_cache_size(), keep=key, grace=EVICTION_GRACE) if changed else []
+        _store_index(index)
+    for evicted_key in evicted:
+        _remove_entry(evicted_key)
+
+
+def _evict(index: dict, max_size: int, keep: Optional[str] = None, grace: float = 0) -> list[str]:
+    """Drop least recently used entries from `index` until it fits in `max_size`.
+
+    Entries accessed in the last `grace` seconds are kept even if that leaves the
+    cache over its size.
+    """
+    entries = index["entries"]
+    total = sum(entry["size"] for entry in entries.values())
+    evicted = []
+    for key, entry in sorted(entries.items(), key=lambda item: item[1]["last_access"]):
+        if total <= max_size or time.time() - entry["last_access"] < grace:
+            break
+        if key == keep:
+            continue
+        total -= entry["size"]
+        evicted.append(key)
+    for key in evicted:
+        del entries[key]
+    return evicted
+
+
+def cache_stats() -> dict:
+    index = _load_index()
+    kinds = {}
+    for kind in CACHE_KINDS:
+        entries = [entry for entry in index["entries"].values() if entry["kind"] == kind]
+        counters = index["counters"].get(kind, {"hits": 0, "misses": 0})
+        lookups = counters["hits"] + counters["misses"]
+        kinds[kind] = {
+            "entries": len(entries),
+            "size": sum(entry["size"] for entry in entries),
+            "hits": counters["hits"],
+            "misses": counters["misses"],
+            "hit_rate": counters["hits"] / lookups if lookups else None,
+        }
+    return {
+        "path": cache_dir(),
+        "max_size": max_cache_size(),
+        "size": sum(kind["size"] for kind in kinds.values()),
+        "kinds": kinds,
+        "entries": index["entries"],
+        "legacy_cookiecutters_size": disk_usage(LEGACY_COOKIECUTTERS_DIR) if os.path.isdir(LEGACY_COOKIECUTTERS_DIR) else 0,
+    }
+
+
+def prune_cache(max_size: Optional[int] = None) -> list[str]:
+    """Evict least recently used entries until the cache fits in `max_size` (default: the cap)"""
+    with file_lock(f"{_index_path()}.lock"):
+        index = _load_index()
+        evicted = _evict(index, max_cache_size() if max_size is None else max_size)
+        _store_index(index)
+    for key in evicted:
+        _remove_entry(key)
+    return evicted
+
+
+def clear_cache(cookiecutters: bool = False) -> int:
+    """Delete every cache area (and optionally ~/.cookiecutters). Returns the bytes freed"""
+    freed = 0
+    with file_lock(f"{_index_path()}.lock"):
+        for kind in CACHE_KINDS:
+            path = os.path.join(cache_dir(), kind)
+            freed += disk_usage(path)
+            shutil.rmtree(path, ignore_errors=True)
+        _store_index({"entries": {}, "counters": _load_index()["counters"]})
+    if cookiecutters and os.path.isdir(LEGACY_COOKIECUTTERS_DIR):
+        freed += disk_usage(LEGACY_COOKIECUTTERS_DIR)
+        shutil.rmtree(LEGACY_COOKIECUTTERS_DIR, ignore_errors=True)
+    return freed
+
+
+def verify_cache() -> list[dict]:
+    """Check every indexed entry and repair what can be repaired. Returns the problems found.
+
+    Missing entries are dropped from the index, snapshots whose size changed are
+    deleted (they are refetched on next use), mirrors must pass `git fsck` and
+    leftover temporary directories from interrupted fetches are removed.
+    """
+    problems = []
+    with file_lock(f"{_index_path()}.lock"):
+        index = _load_index()
+        for key, entry in list(index["entries"].items()):
+            path = os.path.join(cache_dir(), key)
+            problem = None
+            if not os.path.exists(path):
+                problem = "missing"
+            elif entry["kind"] == "snapshots" and disk_usage(path) != entry["size"]:
+                problem = "size mismatch"
+            elif entry["kind"] == "mirrors":
+                result = subprocess.run(
+                    ["git", "fsck", "--connectivity-only", "--no-progress"],
+                    cwd=path, capture_output=True, text=True,
+                )
+                if result.returncode != 0:
+                    problem = "git fsck failed"
+            if problem:
+                problems.append({"entry": key, "problem": problem})
+                del index["entries"][key]
+                _remove_entry(key)
+        _store_index(index)
+
+    # <entry>.<pid>[-<random>].tmp left by fetches and writes that were killed
+    patterns = ("*.tmp", "*/*.tmp", "refs/*/*.tmp", "mirrors/*/*.tmp", "snapshots/*/*/*.tmp", "files/*/*/*/*.tmp", "jinja/*/*.tmp", "renders/*/*.tmp")
+    for pattern in patterns:
+        for path in glob.glob(os.path.join(cache_dir(), pattern)):
+            if time.time() - os.path.getmtime(path) < STALE_TMP_AGE:
+                continue  # probably a fetch still running in another process
+            shutil.rmtree(path, ignore_errors=True)
+            problems.append({"entry": os.path.relpath(path, cache_dir()), "problem": "leftover temporary directory"})
+    return problems
@@ -0,0 +1,91 @@
+import os
+import sys
+import time
+import hashlib
+from . import github, http_client
+from .cache import cache_dir, load_json, store_json
+from .cache_index import record_access
+from .credentials import github_headers
+
+# Seconds a cached catalog is served without asking GitHub again (A3T_CATALOG_TTL)
+DEFAULT_CATALOG_TTL = 600
+
+
+def catalog_ttl() -> float:
+    try:
+        return float(os.environ.get("A3T_CATALOG_TTL", DEFAULT_CATALOG_TTL))
+    except ValueError:
+        return DEFAULT_CATALOG_TTL
+
+
+def serve_stale_on_error() -> bool:
+    """Whether an expired catalog may be used when GitHub can't be reached (A3T_CATALOG_STALE)"""
+    return os.environ.get("A3T_CATALOG_STALE", "1").lower() not in ("0", "false", "no")
+
+
+def _catalog_cache_path(url: str) -> str:
+    key = hashlib.sha256(url.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir("catalog"), f"{key}.json")
+
+
+def fetch_catalog(url: str) -> dict:
+    """Fetch and parse the templates.yaml catalog, using the on-disk cache when possible.
+
+    A cached catalog younger than the TTL is returned without any request. Older
+    entries are revalidated with If-None-Match/If-Modified-Since, so an unchanged
+    catalog costs a 304 (which doesn't count against GitHub's rate limit). If the
+    request fails and stale serving is enabled, the last known catalog is used.
+    Offline, the cached catalog (e.g. imported from a bundle) is used whatever its age.
+    """
+    path = _catalog_cache_path(url)
+    cached = load_json(path)
+    if cached and (time.time() - cached.get("fetched_at", 0) < catalog_ttl() or http_client.offline()):
+        record_access("catalog", path, hit=True, origin=url)
+        return cached["data"]
+
+    import requests
+    import yaml
+
+    # Authenticated requests get GitHub's 5000 req/h budget instead of 60 per IP
+    headers = {**github_headers(), "Accept": "application/vnd.github.v3.raw"}
+    if cached and cached.get("etag"):
+        headers["If-None-Match"] = cached["etag"]
+    if cached and cached.get("last_modified"):
+        headers["If-Modified-Since"] = cached["last_modified"]
+
+    try:
+        response = github.get(url, headers=headers)
+        if response.status_code == 401 and "Authorization" in headers:
+            # Expired or revoked token: the catalog is public, so ask again anonymously
+            del headers["Authorization"]
+            response = github.get(url, headers=headers)
+        if response.status_code == 304 and cached:
+            cached["fetched_at"] = time.time()
+            store_json(path, cached)
+            record_access("catalog", path, hit=True, origin=url)
+            return cached["data"]
+        if response.status_code == 401:
+            # A RequestException, so a cached catalog is still served below
+            raise requests.HTTPError(
+                "Você não possui acesso a esse repositório ou não esta logado na conta do github. Execute `gh auth login` primeiro.",
+                response=response,
+            )
+        response.raise_for_status()
+    except requests.RequestException as e:
+        if cached and serve_stale_on_error():
+            age = int(time.time() - cached.get("fetched_at", 0))
+            print(f"\033[93mWarning: GitHub indisponível ({e.__class__.__name__}), usando catálogo em cache de {age}s atrás.\033[0m", file=sys.stderr)
+            record_access("catalog", path, hit=True, origin=url)
+            return cached["data"]
+        raise
+
+    data = yaml.safe_load(response.text)
+    store_json(path, {
+        "url": url,
+        "etag": response.headers.get("ETag"),
+        "last_modified": response.headers.get("Last-Modified"),
+        "fetched_at": time.time(),
+        "data": data,
+    })
+    record_access("catalog", path, hit=False, origin=url)
+    return data
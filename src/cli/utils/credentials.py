@@ -0,0 +1,114 @@
+import os
+import threading
+import subprocess
+from dataclasses import dataclass
+from typing import Optional
+
+GITHUB_HOST = "github.com"
+
+
+@dataclass
+class Credentials:
+    """GitHub token and username resolved for this process"""
+    token: Optional[str] = None
+    user: Optional[str] = None
+    source: str = ""  # where the token came from, empty when there is none
+
+
+def _gh_hosts_path() -> str:
+    config_dir = os.environ.get("GH_CONFIG_DIR")
+    if not config_dir:
+        xdg = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser("~/.config")
+        config_dir = os.path.join(xdg, "gh")
+    return os.path.join(config_dir, "hosts.yml")
+
+
+def _from_env() -> Credentials:
+    for var in ("GH_TOKEN", "GITHUB_TOKEN"):
+        if os.environ.get(var):
+            return Credentials(token=os.environ[var], source=var)
+    return Credentials()
+
+
+def _from_gh_hosts() -> Credentials:
+    # Newer gh versions keep the token in the system keyring and only the user here
+    path = _gh_hosts_path()
+    if not os.path.exists(path):
+        return Credentials()
+    import yaml
+
+    with open(path, "r") as file:
+        config = yaml.safe_load(file) or {}
+    github_info = config.get(GITHUB_HOST) or {}
+    token = github_info.get("oauth_token")
+    return Credentials(token=token, user=github_info.get("user"), source="hosts.yml" if token else "")
+
+
+def _from_gh_cli() -> Credentials:
+    result = subprocess.run(
+        ["gh", "auth", "token", "--hostname", GITHUB_HOST],
+        capture_output=True, text=True, timeout=5,
+    )
+    token = result.stdout.strip() if result.returncode == 0 else None
+    return Credentials(token=token or None, source="gh auth token" if token else "")
+
+
+def _from_git_credential() -> Credentials:
+    # Never prompt, in the terminal or in a window (Git Credential Manager)
+    env = {**os.environ, "GIT_TERMINAL_PROMPT": "0", "GIT_ASKPASS": "", "SSH_ASKPASS": "", "GCM_INTERACTIVE": "never"}
+    result = subprocess.run(
+        ["git", "credential", "fill"],
+        input=f"protocol=https\nhost={GITHUB_HOST}\n\n",
+        capture_output=True, text=True, timeout=5, env=env,
+    )
+    if result.returncode != 0:
+        return Credentials()
+    fields = dict(line.split("=", 1) for line in result.stdout.splitlines() if "=" in line)
+    token = fields.get("password")
+    return Credentials(token=token, user=fields.get("username"), source="git credential" if token else "")
+
+
+# Tried in order; the first token found wins, the username may come from any of them
+SOURCES = (_from_env, _from_gh_hosts, _from_gh_cli, _from_git_credential)
+
+_credentials: Optional[Credentials] = None
+# Startup resolves from several threads at once (catalog, credentials, telemetry info)
+_credentials_lock = threading.Lock()
+
+
+def get_credentials() -> Credentials:
+    """Resolve the GitHub token and user once per process.
+
+    Sources: $GH_TOKEN/$GITHUB_TOKEN, gh's hosts.yml, `gh auth token` (tokens in the
+    keyring) and the git credential helper. The subprocess-based sources only run
+    when no token was found before them. Concurrent callers wait for a single resolution.
+    """
+    global _credentials
+    if _credentials is None:
+        with _credentials_lock:
+            if _credentials is None:
+                _credentials = _resolve_credentials()
+    return _credentials
+
+
+def _resolve_credentials() -> Credentials:
+    credentials = Credentials()
+    for source in SOURCES:
+        try:
+            found = source()
+        except Exception:
+            continue  # a broken source must never stop the CLI
+        if not credentials.token and found.token:
+            credentials.token, credentials.source = found.token, found.source
+        if not credentials.user and found.user:
+            credentials.user = found.user
+        # With a token from the environment, still read hosts.yml (cheap) for the username
+        if credentials.token and (credentials.user or source is not _from_env):
+            break
+    return credentials
+
+
+def github_headers() -> dict:
+    """Authorization header for GitHub API calls, empty when there is no token"""
+    token = get_credentials().token
+    return {"Authorization": f"Bearer {token}"} if token else {}
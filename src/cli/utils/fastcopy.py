@@ -0,0 +1,221 @@
+import os
+import sys
+import time
+import errno
+import atexit
+import shutil
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional
+from .cache import cache_dir, temp_path
+
+# Linux ioctl that clones a whole file (a reflink) on copy-on-write filesystems: btrfs, XFS, bcachefs...
+FICLONE = 0x40049409
+# Chunk size of the buffered fallback
+BUFFER_SIZE = 1 << 20
+# Files copied at the same time by copy_tree()
+COPY_WORKERS = 8
+# Errors meaning "not supported here", after which the next method is tried
+UNSUPPORTED = {errno.EXDEV, errno.EOPNOTSUPP, errno.ENOTSUP, errno.EINVAL, errno.ENOTTY, errno.ENOSYS, errno.EBADF, errno.EPERM, errno.EMLINK}
+
+_stats = {"files": 0, "bytes": 0, "seconds": 0.0, "methods": {}}
+_stats_lock = threading.Lock()
+# (method, device) pairs where a method already failed, so it isn't retried for every file
+_unsupported: set[tuple[str, int]] = set()
+
+
+def links_enabled() -> bool:
+    """Whether files of the template cache may be hardlinked instead of copied (A3T_COPY_LINKS)"""
+    return os.environ.get("A3T_COPY_LINKS", "").lower() not in ("", "0", "false", "no")
+
+
+def _immutable(path: str) -> bool:
+    # Snapshot files are never written again once in the cache (entries are replaced whole)
+    snapshots = os.path.realpath(cache_dir("snapshots"))
+    return os.path.realpath(path).startswith(snapshots + os.sep)
+
+
+def _reflink(infd: int, outfd: int) -> None:
+    import fcntl
+
+    fcntl.ioctl(outfd, FICLONE, infd)
+
+
+def _copy_file_range(infd: int, outfd: int) -> None:
+    while os.copy_file_range(infd, outfd, BUFFER_SIZE * 64):
+        pass
+
+
+def _sendfile(infd: int, outfd: int) -> None:
+    offset = 0
+    while True:
+        sent = os.sendfile(outfd, infd, offset, BUFFER_SIZE * 64)
+        if not sent:
+            return
+        offset += sent
+
+
+def _buffered(infd: int, outfd: int) -> None:
+    while True:
+        data = os.read(infd, BUFFER_SIZE)
+        if not data:
+            return
+        view = memoryview(data)
+        while view:
+            view = view[os.write(outfd, view):]
+
+
+# Fastest first; reflink and copy_file_range don't even move the data on filesystems that share extents
+_METHODS = [
+    ("reflink", _reflink if sys.platform.startswith("linux") else None),
+    ("copy_file_range", _copy_file_range if hasattr(os, "copy_file_range") else None),
+    ("sendfile", _sendfile if sys.platform.startswith("linux") else None),
+    ("buffered", _buffered),
+]
+
+
+def _copy_contents(src: str, dst: str) -> str:
+    with open(src, "rb") as fsrc, open(dst, "wb") as fdst:
+        infd, outfd = fsrc.fileno(), fdst.fileno()
+        device = os.fstat(outfd).st_dev
+        for method, copy in _METHODS:
+            if copy is None or (method, device) in _unsupported:
+                continue
+            try:
+                copy(infd, outfd)
+                return method
+            except OSError as e:
+                if method == "buffered" or e.errno not in UNSUPPORTED:
+                    raise
+                _unsupported.add((method, device))
+                # Start over from scratch with the next method
+                os.lseek(infd, 0, os.SEEK_SET)
+                os.lseek(outfd, 0, os.SEEK_SET)
+                os.ftruncate(outfd, 0)
+    raise AssertionError("unreachable")
+
+
+def _link(src: str, dst: str) -> bool:
+    device = os.stat(os.path.dirname(os.path.abspath(dst))).st_dev
+    if ("link", device) in _unsupported:
+        return False
+    tmp_path = temp_path(dst)
+    try:
+        os.link(src, tmp_path)
+    except OSError as e:
+        if e.errno not in UNSUPPORTED:
+            raise
+        _unsupported.add(("link", device))
+        return False
+    os.replace(tmp_path, dst)
+    return True
+
+
+def _record(method: str, size: int, elapsed: float) -> None:
+    with _stats_lock:
+        _stats["files"] += 1
+        _stats["bytes"] += size
+        _stats["seconds"] += elapsed
+        _stats["methods"][method] = _stats["methods"].get(method, 0) + 1
+
+
+def copy_file(src: str, dst: str, metadata: str = "mode", links: Optional[bool] = None) -> str:
+    """Copy `src` to `dst` with the fastest method the filesystems support; returns the method.
+
+    Files of the template cache are hardlinked when `links` (by default,
+    links_enabled()): only for output that is read and thrown away. Otherwise the
+    data is cloned (FICLONE), copied in the kernel (copy_file_range, sendfile) or
+    read and written in large chunks. `metadata` is "mode", "stat" (mode and
+    times, like shutil.copy2) or "" (data only, like shutil.copyfile).
+    """
+    start = time.perf_counter()
+    size = os.path.getsize(src)
+    if links is None:
+        links = links_enabled()
+    if links and _immutable(src) and _link(src, dst):
+        method = "link"  # same inode: mode and times are the source's already
+    else:
+        method = _copy_contents(src, dst)
+        if metadata == "stat":
+            shutil.copystat(src, dst)
+        elif metadata == "mode":
+            shutil.copymode(src, dst)
+    _record(method, size, time.perf_counter() - start)
+    return method
+
+
+def copy_tree(
+    src: str,
+    dst: str,
+    symlinks: bool = False,
+    metadata: str = "stat",
+    dirs_exist_ok: bool = False,
+    links: Optional[bool] = None,
+) -> None:
+    """shutil.copytree() through copy_file(), copying files on a thread pool.
+
+    Directories are created while walking `src`, files are copied concurrently,
+    and directory modes (and times, for "stat") are applied last, so read-only
+    directories like the ones in the Nix store can still be filled.
+    """
+    directories = []
+    with ThreadPoolExecutor(max_workers=COPY_WORKERS, thread_name_prefix="a3t-fastcopy") as executor:
+        futures = []
+        for root, dirs, files in os.walk(src):
+            target = os.path.normpath(os.path.join(dst, os.path.relpath(root, src)))
+            os.makedirs(target, exist_ok=dirs_exist_ok)
+            directories.append((root, target))
+            linked_dirs = [d for d in dirs if os.path.islink(os.path.join(root, d))]
+            for name in files + linked_dirs:
+                source = os.path.join(root, name)
+                if symlinks and os.path.islink(source):
+                    os.symlink(os.readlink(source), os.path.join(target, name))
+                elif name in linked_dirs:
+                    copy_tree(source, os.path.join(target, name), symlinks, metadata, dirs_exist_ok, links)
+                else:
+                    futures.append(executor.submit(copy_file, source, os.path.join(target, name), metadata, links))
+        for future in futures:
+            future.result()
+    for root, target in reversed(directories):
+        if metadata == "stat":
+            shutil.copystat(root, target)
+        elif metadata == "mode":
+            shutil.copymode(root, target)
+
+
+def copy_stats() -> dict:
+    """Files and bytes copied by this process, seconds spent copying and files per method"""
+    with _stats_lock:
+        return {**_stats, "methods": dict(_stats["methods"])}
+
+
+def take_stats() -> dict:
+    """copy_stats(), resetting them: used by worker processes to hand their numbers back"""
+    global _stats
+    with _stats_lock:
+        stats, _stats = _stats, {"files": 0, "bytes": 0, "seconds": 0.0, "methods": {}}
+    return stats
+
+
+def merge_stats(stats: dict) -> None:
+    """Add the stats of a worker process (from take_stats()) to this process'"""
+    with _stats_lock:
+        for key in ("files", "bytes", "seconds"):
+            _stats[key] += stats[key]
+        for method, count in stats["methods"].items():
+            _stats["methods"][method] = _stats["methods"].get(method, 0) + count
+
+
+def _print_stats() -> None:
+    stats = copy_stats()
+    if not stats["files"]:
+        return
+    rate = stats["bytes"] / stats["seconds"] / 1e6 if stats["seconds"] else 0.0
+    methods = ", ".join(f"{method}: {count}" for method, count in sorted(stats["methods"].items()))
+    print(f"Cópia: {stats['files']} arquivos, {stats['bytes'] / 1e6:.1f} MB, {stats['seconds']:.3f}s ({rate:.0f} MB/s; {methods})", file=sys.stderr)
+
+
+# Worker processes hand their stats to the process that started them
+if os.environ.get("A3T_COPY_STATS") and multiprocessing.parent_process() is None:
+    atexit.register(_print_stats)
@@ -0,0 +1,109 @@
+import os
+import tarfile
+from . import github
+from . import mirror
+from .credentials import github_headers
+from .mirror import git, repo_url
+
+# How a template repository is downloaded:
+#   mirror  - checkout from the local bare mirror, updated with an incremental fetch
+#   shallow - depth-1 clone of the branch tip
+#   partial - blobless clone (--filter=blob:none), blobs fetched on checkout
+#   sparse  - blobless depth-1 clone with only `subdirectory` checked out
+#   archive - snapshot from GitHub's tarball endpoint, no git involved
+FETCH_STRATEGIES = ("mirror", "shallow", "partial", "sparse", "archive")
+DEFAULT_FETCH = "mirror"
+
+
+def resolve_strategy(*candidates: str) -> str:
+    """Pick the first strategy set among `candidates` (CLI flag, catalog entry...), then $A3T_FETCH"""
+    for strategy in (*candidates, os.environ.get("A3T_FETCH"), DEFAULT_FETCH):
+        if strategy:
+            if strategy not in FETCH_STRATEGIES:
+                raise ValueError(f"Estratégia de download inválida: {strategy}. Use uma de: {', '.join(FETCH_STRATEGIES)}")
+            return strategy
+
+
+def fetch_repository(
+    organization: str,
+    repository: str,
+    branch: str,
+    dest: str,
+    strategy: str = DEFAULT_FETCH,
+    subdirectory: str = "",
+    commit: str = "",
+) -> str:
+    """Download `branch` of a template repository into `dest` using `strategy`. Returns `dest`
+
+    With `commit`, that exact commit is checked out (detached) instead of the branch tip.
+    """
+    if strategy == "mirror":
+        mirror.checkout(organization, repository, branch, dest)
+        _checkout_commit(dest, commit)
+        return dest
+    if strategy == "archive":
+        return fetch_archive(organization, repository, commit or branch, dest, subdirectory)
+
+    url = repo_url(organization, repository)
+    if strategy == "shallow":
+        git("clone", "--quiet", "--depth", "1", "--single-branch", "--branch", branch, url, dest)
+        _checkout_commit(dest, commit, fetch_args=("--depth", "1"))
+    elif strategy == "partial":
+        git("clone", "--quiet", "--filter=blob:none", "--single-branch", "--branch", branch, url, dest)
+        _checkout_commit(dest, commit, fetch_args=("--filter=blob:none",))
+    elif strategy == "sparse":
+        if not subdirectory:
+            raise ValueError("A estratégia 'sparse' precisa de um `subdirectory` no templates.yaml")
+        git("clone", "--quiet", "--depth", "1", "--filter=blob:none", "--no-checkout",
+            "--single-branch", "--branch", branch, url, dest)
+        git("sparse-checkout", "set", subdirectory, cwd=dest)
+        git("checkout", "--quiet", branch, cwd=dest)
+        _checkout_commit(dest, commit, fetch_args=("--depth", "1", "--filter=blob:none"))
+    else:
+        raise ValueError(f"Estratégia de download inválida: {strategy}")
+    return dest
+
+
+def _checkout_commit(dest: str, commit: str, fetch_args: tuple = ()) -> None:
+    """Detach `dest` at `commit`, fetching it first when the clone doesn't have it"""
+    if not commit:
+        return
+    if git("rev-parse", "HEAD", cwd=dest).strip() == commit:
+        return
+    if fetch_args:
+        git("fetch", "--quiet", *fetch_args, "origin", commit, cwd=dest)
+    git("checkout", "--quiet", "--detach", commit, cwd=dest)
+
+
+def fetch_archive(organization: str, repository: str, ref: str, dest: str, subdirectory: str = "") -> str:
+    """Download the tar.gz snapshot of `ref` (branch or commit) and extract it into `dest` while it streams.
+
+    The archive is read straight from the socket, member by member, so it is never
+    held in memory or written to disk. GitHub wraps everything in a
+    `{org}-{repo}-{sha}/` directory, which is stripped; with `subdirectory` only
+    that part of the tree is extracted (keeping its path).
+    """
+    url = f"https://api.github.com/repos/{organization}/{repository}/tarball/{ref}"
+    os.makedirs(dest, exist_ok=True)
+    root = os.path.realpath(dest)
+    prefix = subdirectory.strip("/") + "/" if subdirectory else ""
+    extract_kwargs = {"filter": "data"} if hasattr(tarfile, "data_filter") else {}
+
+    with github.get(url, headers=github_headers(), stream=True) as response:
+        if response.status_code in (401, 404):
+            raise RuntimeError(f"Repositório {organization}/{repository}@{ref} não encontrado ou sem acesso. Execute `gh auth login` primeiro.")
+        response.raise_for_status()
+        response.raw.decode_content = True
+        with tarfile.open(fileobj=response.raw, mode="r|gz") as archive:
+            for member in archive:
+                _, _, name = member.name.partition("/")
+                if not name or not name.startswith(prefix):
+                    continue
+                target = os.path.realpath(os.path.join(root, name))
+                if os.path.commonpath([root, target]) != root:
+                    raise RuntimeError(f"Caminho inválido no arquivo do template: {member.name}")
+                member.name = name
+                if member.islnk():
+                    member.linkname = member.linkname.partition("/")[2]
+                archive.extract(member, root, **extract_kwargs)
+    return dest
@@ -0,0 +1,119 @@
+import os
+import time
+import random
+import hashlib
+from typing import TYPE_CHECKING
+from . import http_client
+from .cache import cache_dir, load_json, store_json
+from .credentials import get_credentials
+from .filelock import file_lock
+
+if TYPE_CHECKING:
+    import requests
+
+# Attempts after the first one for 429, 5xx and rate-limited 403 responses
+MAX_RETRIES = 3
+# Jittered exponential backoff: BACKOFF_BASE * 2**attempt seconds, at most BACKOFF_MAX.
+# A longer wait (e.g. until the hourly reset) is not slept through: the call fails
+# and callers fall back to their cached data.
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _budget_path() -> str:
+    return os.path.join(cache_dir(), "github-ratelimit.json")
+
+
+def _budget_key(url: str) -> str:
+    # GitHub counts per token (or per IP when anonymous) and per resource
+    token = get_credentials().token
+    identity = hashlib.sha256(token.encode("utf-8")).hexdigest()[:12] if token else "anonymous"
+    resource = "graphql" if url.rstrip("/").endswith("/graphql") else "core"
+    return f"{identity}:{resource}"
+
+
+def _blocked_until(key: str) -> float:
+    """Time until which no process on this host should call GitHub with this budget"""
+    budget = load_json(_budget_path()) or {}
+    return budget.get(key, {}).get("blocked_until", 0)
+
+
+def _record(key: str, response: "requests.Response") -> None:
+    headers = response.headers
+    remaining = headers.get("X-RateLimit-Remaining")
+    reset = headers.get("X-RateLimit-Reset")
+    retry_after = headers.get("Retry-After")
+    if remaining is None and retry_after is None:
+        return
+    entry = {"updated_at": time.time()}
+    if remaining is not None:
+        entry["remaining"] = int(remaining)
+        entry["reset"] = float(reset or 0)
+    blocked_until = 0.0
+    if retry_after is not None and response.status_code in (403, 429):
+        blocked_until = time.time() + float(retry_after)
+    elif remaining == "0":
+        blocked_until = entry["reset"]
+    entry["blocked_until"] = blocked_until
+
+    path = _budget_path()
+    with file_lock(f"{path}.lock"):
+        budget = load_json(path) or {}
+        budget[key] = entry
+        store_json(path, budget)
+
+
+def _should_retry(response: "requests.Response") -> bool:
+    if response.status_code in RETRY_STATUSES:
+        return True
+    # 403 is also how GitHub reports primary and secondary rate limits
+    return response.status_code == 403 and (
+        response.headers.get("X-RateLimit-Remaining") == "0" or "Retry-After" in response.headers
+    )
+
+
+def _retry_delay(response: "requests.Response", attempt: int) -> float:
+    if "Retry-After" in response.headers:
+        return float(response.headers["Retry-After"])
+    if response.headers.get("X-RateLimit-Remaining") == "0":
+        return float(response.headers.get("X-RateLimit-Reset", 0)) - time.time()
+    return min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX) * random.uniform(0.5, 1.5)
+
+
+def request(method: str, url: str, **kwargs) -> "requests.Response":
+    """Call the GitHub API through the shared session, respecting its rate limits.
+
+    The last X-RateLimit-Remaining/Reset and Retry-After seen are kept in a budget
+    file shared (under a lock) by every a3t process on the host. While the budget
+    is exhausted, calls fail immediately with requests' RetryError instead of
+    hitting GitHub, so callers serve their cached data. 429, 5xx and rate-limited
+    403 responses are retried with jittered exponential backoff.
+    """
+    import requests
+
+    key = _budget_key(url)
+    for attempt in range(MAX_RETRIES + 1):
+        blocked_until = _blocked_until(key)
+        if blocked_until > time.time():
+            raise requests.exceptions.RetryError(
+                f"Limite de requisições do GitHub esgotado até {time.strftime('%H:%M:%S', time.localtime(blocked_until))}."
+            )
+        response = http_client.get_session().request(method, url, **kwargs)
+        _record(key, response)
+        if attempt == MAX_RETRIES or not _should_retry(response):
+            return response
+        delay = _retry_delay(response, attempt)
+        if delay > BACKOFF_MAX:
+            return response
+        response.close()
+        time.sleep(max(delay, 0))
+    return response
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return request("GET", url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return request("POST", url, **kwargs)
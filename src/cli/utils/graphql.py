@@ -0,0 +1,91 @@
+import os
+import json
+import time
+import hashlib
+from dataclasses import dataclass, asdict
+from typing import Optional
+from . import github
+from .cache import cache_dir, load_json, store_json
+from .cache_index import record_access
+from .catalog import catalog_ttl
+from .credentials import github_headers
+
+GRAPHQL_URL = "https://api.github.com/graphql"
+
+
+@dataclass
+class RemoteInfo:
+    """What GitHub reports about a catalog entry for the current user"""
+    accessible: bool
+    commit: str = ""
+    config: Optional[str] = None  # contents of configPath at `commit`, None if missing
+
+
+def _build_query(configs: list) -> str:
+    fields = []
+    for idx, config in enumerate(configs):
+        ref = json.dumps(f"refs/heads/{config.branch}")
+        selection = f"ref(qualifiedName: {ref}) {{ target {{ oid }} }}"
+        if config.configPath:
+            expression = json.dumps(f"{config.commit or config.branch}:{config.configPath}")
+            selection += f" config: object(expression: {expression}) {{ ... on Blob {{ text }} }}"
+        fields.append(
+            f"t{idx}: repository(owner: {json.dumps(config.organization)}, name: {json.dumps(config.repository)}) {{ {selection} }}"
+        )
+    return "query { " + " ".join(fields) + " }"
+
+
+def _parse(configs: list, data: dict) -> list[dict]:
+    infos = []
+    for idx, config in enumerate(configs):
+        repo = data.get(f"t{idx}")
+        ref = repo.get("ref") if repo else None
+        if not ref:
+            infos.append(asdict(RemoteInfo(accessible=False)))
+            continue
+        blob = repo.get("config") or {}
+        infos.append(asdict(RemoteInfo(
+            accessible=True,
+            commit=config.commit or ref["target"]["oid"],
+            config=blob.get("text"),
+        )))
+    return infos
+
+
+def fetch_remote_info(configs: list) -> list[Optional[RemoteInfo]]:
+    """Look up access, head commit and option file of every catalog entry in one GraphQL request.
+
+    Results are cached for the catalog TTL, per query and per token (access depends
+    on who asks). GraphQL requires authentication, so without a token, or when the
+    request fails and nothing is cached, every entry comes back as None (unknown).
+    """
+    headers = github_headers()
+    if not headers or not configs:
+        return [None] * len(configs)
+
+    query = _build_query(configs)
+    key = hashlib.sha256((headers["Authorization"] + query).encode("utf-8")).hexdigest()[:16]
+    path = os.path.join(cache_dir("graphql"), f"{key}.json")
+    cached = load_json(path)
+    if cached and time.time() - cached.get("fetched_at", 0) < catalog_ttl():
+        record_access("graphql", path, hit=True, origin=GRAPHQL_URL)
+        return [RemoteInfo(**info) for info in cached["infos"]]
+
+    import requests
+
+    try:
+        response = github.post(GRAPHQL_URL, json={"query": query}, headers=headers)
+        response.raise_for_status()
+        data = response.json().get("data")
+        if data is None:
+            raise ValueError("GraphQL response without data")
+    except (requests.RequestException, ValueError):
+        if cached:
+            record_access("graphql", path, hit=True, origin=GRAPHQL_URL)
+            return [RemoteInfo(**info) for info in cached["infos"]]
+        return [None] * len(configs)
+
+    infos = _parse(configs, data)
+    store_json(path, {"fetched_at": time.time(), "infos": infos})
+    record_access("graphql", path, hit=False, origin=GRAPHQL_URL)
+    return [RemoteInfo(**info) for info in infos]
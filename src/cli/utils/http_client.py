@@ -0,0 +1,106 @@
+import os
+import sys
+import time
+import atexit
+import threading
+from typing import TYPE_CHECKING
+from urllib.parse import urlsplit
+
+if TYPE_CHECKING:
+    import requests
+
+# (connect, read) timeout applied to every request that doesn't set its own
+DEFAULT_TIMEOUT = (5, 30)
+# Number of per-host connection pools kept alive and connections per host
+POOL_CONNECTIONS = 8
+POOL_MAXSIZE = 4
+
+_session = None
+_session_lock = threading.Lock()
+_stats: dict[str, dict[str, float]] = {}
+_stats_lock = threading.Lock()
+
+
+def offline() -> bool:
+    """Whether the CLI must not touch the network (A3T_OFFLINE, set by `--bundle`)"""
+    return os.environ.get("A3T_OFFLINE", "").lower() not in ("", "0", "false", "no")
+
+
+def _record(url: str, elapsed: float) -> None:
+    host = urlsplit(url).netloc
+    with _stats_lock:
+        entry = _stats.setdefault(host, {"requests": 0, "seconds": 0.0})
+        entry["requests"] += 1
+        entry["seconds"] += elapsed
+
+
+def _create_session() -> "requests.Session":
+    # requests is imported on the first network call, not when the CLI starts
+    import requests
+    from requests.adapters import HTTPAdapter
+
+    class _PooledSession(requests.Session):
+        """requests.Session with default timeouts and per-host timing counters"""
+
+        def request(self, method, url, *args, **kwargs):
+            if offline():
+                # Fail like an unreachable host, so callers use their cached data
+                raise requests.exceptions.ConnectionError(f"Modo offline: {url} não foi acessado.")
+            kwargs.setdefault("timeout", DEFAULT_TIMEOUT)
+            start = time.perf_counter()
+            try:
+                return super().request(method, url, *args, **kwargs)
+            finally:
+                _record(url, time.perf_counter() - start)
+
+    session = _PooledSession()
+    adapter = HTTPAdapter(
+        pool_connections=POOL_CONNECTIONS,
+        pool_maxsize=POOL_MAXSIZE,
+        pool_block=True,
+    )
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_session() -> "requests.Session":
+    """Return the process-wide HTTP session shared by catalog, template and telemetry calls.
+
+    Connections are kept alive between requests, so repeated calls to api.github.com
+    or the telemetry host reuse the same TCP+TLS connection.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def get(url: str, **kwargs) -> "requests.Response":
+    return get_session().get(url, **kwargs)
+
+
+def post(url: str, **kwargs) -> "requests.Response":
+    return get_session().post(url, **kwargs)
+
+
+def http_stats() -> dict[str, dict[str, float]]:
+    """Request count and accumulated seconds spent waiting on each host"""
+    with _stats_lock:
+        return {host: dict(entry) for host, entry in _stats.items()}
+
+
+def _print_stats() -> None:
+    stats = http_stats()
+    if not stats:
+        return
+    total = sum(entry["seconds"] for entry in stats.values())
+    print(f"HTTP: {sum(int(e['requests']) for e in stats.values())} requests, {total:.3f}s", file=sys.stderr)
+    for host, entry in sorted(stats.items()):
+        print(f"  {host}: {int(entry['requests'])} requests, {entry['seconds']:.3f}s", file=sys.stderr)
+
+
+if os.environ.get("A3T_HTTP_STATS"):
+    atexit.register(_print_stats)
@@ -0,0 +1,216 @@
+import os
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Optional
+from jinja2 import Environment, meta, nodes
+from jinja2.bccache import Bucket, FileSystemBytecodeCache
+from jinja2.defaults import DEFAULT_FILTERS
+from jinja2.exceptions import TemplateSyntaxError
+from .cache import cache_dir, load_json, store_json, temp_path
+from .filelock import file_lock
+
+# Context variables the rendered output of a cookiecutter file may depend on
+CONTEXT_ROOTS = ("cookiecutter", "_cookiecutter")
+# Globals that don't make the output depend on anything but the context (unlike lipsum or uuid4)
+DETERMINISTIC_GLOBALS = {"range", "dict", "cycler", "joiner", "namespace"}
+# Filters of cookiecutter's default extensions; other non-builtin filters may not be pure
+DETERMINISTIC_EXTENSION_FILTERS = {"jsonify", "slugify"}
+
+# Compiled code by (cache dir, source checksum), so long-lived processes (`a3t serve`
+# workers) don't even read and unmarshal the cache files again; least recently used
+# entries are dropped past MAX_COMPILED, as every template revision adds its own
+MAX_COMPILED = 4096
+_compiled: "OrderedDict[tuple[str, str], object]" = OrderedDict()
+_compiled_lock = threading.Lock()
+
+
+def _remember_compiled(key: tuple[str, str], code) -> None:
+    with _compiled_lock:
+        _compiled[key] = code
+        _compiled.move_to_end(key)
+        while len(_compiled) > MAX_COMPILED:
+            _compiled.popitem(last=False)
+
+
+def _recall_compiled(key: tuple[str, str]):
+    with _compiled_lock:
+        code = _compiled.get(key)
+        if code is not None:
+            _compiled.move_to_end(key)
+        return code
+
+
+class ContentBytecodeCache(FileSystemBytecodeCache):
+    """Jinja bytecode cache keyed by the template source instead of its name.
+
+    cookiecutter loads templates by relative name from the template dir, so names
+    alone can't identify a template; an edited file simply gets a new entry.
+    Entries are written to a temporary file and renamed, so concurrent builds can
+    share the directory. Loaded code is also kept in memory (see _compiled).
+    """
+
+    def get_bucket(self, environment: Environment, name: str, filename, source: str) -> Bucket:
+        key = self.get_source_checksum(source)
+        bucket = Bucket(environment, key, key)
+        code = _recall_compiled((self.directory, key))
+        if code is not None:
+            bucket.code = code
+            return bucket
+        self.load_bytecode(bucket)
+        if bucket.code is not None:
+            _remember_compiled((self.directory, key), bucket.code)
+        return bucket
+
+    def set_bucket(self, bucket: Bucket) -> None:
+        super().set_bucket(bucket)
+        _remember_compiled((self.directory, bucket.key), bucket.code)
+
+
+def template_cache_key(env: Environment, template_dir: str) -> str:
+    """Key for one template (snapshot) rendered with `env`'s syntax settings.
+
+    The compiled code depends on the delimiters, whitespace options and extensions
+    (cookiecutter's `_extensions`), so they are part of the key with the template dir.
+    """
+    settings = (
+        template_dir,
+        sorted(env.extensions),
+        env.block_start_string, env.block_end_string,
+        env.variable_start_string, env.variable_end_string,
+        env.comment_start_string, env.comment_end_string,
+        env.line_statement_prefix, env.line_comment_prefix,
+        env.trim_blocks, env.lstrip_blocks, env.newline_sequence, env.keep_trailing_newline,
+        env.autoescape if isinstance(env.autoescape, bool) else True,
+    )
+    return hashlib.sha256(repr(settings).encode("utf-8")).hexdigest()[:16]
+
+
+def bytecode_cache_dir(env: Environment, template_dir: str) -> str:
+    return cache_dir("jinja", template_cache_key(env, template_dir))
+
+
+def enable_bytecode_cache(env: Environment, template_dir: str) -> str:
+    """Persist the compiled code of every template `env` loads or renders from a string.
+
+    get_template() goes through env.bytecode_cache. from_string(), which
+    cookiecutter uses for every file and directory name, normally bypasses it and
+    recompiles each time; here it is backed by the same cache. Returns the cache dir.
+    """
+    directory = bytecode_cache_dir(env, template_dir)
+    bytecode_cache = ContentBytecodeCache(directory)
+    env.bytecode_cache = bytecode_cache
+
+    def from_string(source, globals=None, template_class=None):
+        if not isinstance(source, str):  # an already parsed template
+            return Environment.from_string(env, source, globals, template_class)
+        bucket = bytecode_cache.get_bucket(env, "<string>", None, source)
+        if bucket.code is None:
+            bucket.code = env.compile(source)
+            bytecode_cache.set_bucket(bucket)
+        cls = template_class or env.template_class
+        return cls.from_code(env, bucket.code, env.make_globals(globals), None)
+
+    env.from_string = from_string
+    return directory
+
+
+def template_references(env: Environment, source: str) -> Optional[list[str]]:
+    """Context values the output of `source` depends on, from its Jinja AST.
+
+    Returns names like "cookiecutter.project_name", or "cookiecutter" when the whole
+    dict is used. Returns None when the output may depend on anything else:
+    includes and imports of other templates, extension tags (like `{% now %}`),
+    unknown globals (uuid4, lipsum...) and filters that aren't known to be pure.
+    """
+    try:
+        ast = env.parse(source)
+    except TemplateSyntaxError:
+        return None  # reported when the file is rendered
+    if any(True for _ in ast.find_all((nodes.ExtensionAttribute, nodes.Include, nodes.Import, nodes.FromImport, nodes.Extends))):
+        return None
+    for node in ast.find_all(nodes.Filter):
+        if node.name == "random" or (node.name not in DEFAULT_FILTERS and node.name not in DETERMINISTIC_EXTENSION_FILTERS):
+            return None
+    # Environment globals count as declared for find_undeclared_variables
+    for node in ast.find_all(nodes.Name):
+        if node.ctx == "load" and node.name in env.globals and node.name not in DETERMINISTIC_GLOBALS:
+            return None
+    undeclared = meta.find_undeclared_variables(ast)
+    if undeclared - set(CONTEXT_ROOTS):
+        return None
+
+    references, attribute_roots = set(), set()
+    for node in ast.find_all((nodes.Getattr, nodes.Getitem)):
+        target = node.node
+        if not isinstance(target, nodes.Name) or target.name not in CONTEXT_ROOTS or target.name not in undeclared:
+            continue
+        if isinstance(node, nodes.Getattr):
+            references.add(f"{target.name}.{node.attr}")
+        elif isinstance(node.arg, nodes.Const) and isinstance(node.arg.value, str):
+            references.add(f"{target.name}.{node.arg.value}")
+        else:
+            continue  # computed key: counted below as a use of the whole dict
+        attribute_roots.add(id(target))
+    for node in ast.find_all(nodes.Name):
+        if node.name in CONTEXT_ROOTS and node.name in undeclared and id(node) not in attribute_roots:
+            references.add(node.name)
+    return sorted(references)
+
+
+def _reference_value(context: dict, reference: str):
+    root, _, attribute = reference.partition(".")
+    value = context.get(root)
+    # `cookiecutter.items()` and the like read the whole dict, not a key
+    if attribute and isinstance(value, dict) and attribute in value:
+        return value[attribute]
+    return value
+
+
+class RenderMemo:
+    """Rendered files of one template, keyed by file content and the context values it references.
+
+    Which values a file references is worked out once per file content (see
+    template_references) and remembered in `references.json`. A file whose
+    references didn't change since an earlier build is copied from here instead
+    of being rendered again.
+    """
+
+    def __init__(self, env: Environment, template_dir: str):
+        self.env = env
+        self.directory = cache_dir("renders", template_cache_key(env, template_dir))
+        self._references_path = os.path.join(self.directory, "references.json")
+        self._references = load_json(self._references_path) or {}
+        self._new_references = {}
+
+    def key(self, source: str, context: dict, newline) -> Optional[str]:
+        """Memo key of `source` rendered with `context`, None if it can't be memoized"""
+        digest = hashlib.sha1(source.encode("utf-8")).hexdigest()
+        if digest not in self._references:
+            self._references[digest] = self._new_references[digest] = template_references(self.env, source)
+        references = self._references[digest]
+        if references is None:
+            return None
+        values = [_reference_value(context, reference) for reference in references]
+        data = json.dumps([digest, references, values, newline], sort_keys=True, default=repr)
+        return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key)
+
+    def store(self, key: str, data: bytes) -> None:
+        tmp_path = temp_path(self.path(key))
+        with open(tmp_path, "wb") as file:
+            file.write(data)
+        os.replace(tmp_path, self.path(key))
+
+    def save(self) -> None:
+        """Persist the references found by this process, merged with other processes'"""
+        if not self._new_references:
+            return
+        with file_lock(f"{self._references_path}.lock"):
+            references = load_json(self._references_path) or {}
+            references.update(self._new_references)
+            store_json(self._references_path, references)
+        self._new_references = {}
@@ -0,0 +1,59 @@
+import os
+import shutil
+import subprocess
+from .cache import cache_dir
+from .cache_index import record_access
+from .filelock import file_lock
+
+
+def repo_url(organization: str, repository: str) -> str:
+    return f"https://github.com/{organization}/{repository}.git"
+
+
+def git(*args: str, cwd: str = None) -> str:
+    """Run a git command, raising RuntimeError with git's stderr on failure"""
+    result = subprocess.run(["git", *args], cwd=cwd, capture_output=True, text=True)
+    if result.returncode != 0:
+        raise RuntimeError(f"git {args[0]} failed: {result.stderr.strip()}")
+    return result.stdout
+
+
+def mirror_path(organization: str, repository: str) -> str:
+    return os.path.join(cache_dir("mirrors", organization), f"{repository}.git")
+
+
+def update_mirror(organization: str, repository: str) -> str:
+    """Create or incrementally update the local bare mirror of a repository.
+
+    The first call clones every branch once; later calls only `git fetch` what
+    changed. Templates that live on different branches of the same repository
+    share one mirror. Returns the mirror path.
+    """
+    path = mirror_path(organization, repository)
+    with file_lock(f"{path}.lock"):
+        if not os.path.isdir(path):
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            shutil.rmtree(tmp_path, ignore_errors=True)
+            git("clone", "--bare", "--quiet", repo_url(organization, repository), tmp_path)
+            # Track branches and tags only, not GitHub's refs/pull/*
+            git("config", "remote.origin.fetch", "+refs/heads/*:refs/heads/*", cwd=tmp_path)
+            os.replace(tmp_path, path)
+            record_access("mirrors", path, hit=False, origin=repo_url(organization, repository))
+        else:
+            # No automatic gc: repacking would pull objects from under concurrent checkouts
+            git("fetch", "--prune", "--tags", "--quiet", "--no-auto-gc", "origin", cwd=path)
+            record_access("mirrors", path, hit=True, origin=repo_url(organization, repository), changed=True)
+    return path
+
+
+def checkout(organization: str, repository: str, branch: str, dest: str) -> str:
+    """Check out `branch` from the (freshly updated) mirror into a new worktree at `dest`.
+
+    The clone is local, so objects are hardlinked instead of transferred again. Its
+    origin points back at GitHub so the result behaves like a regular clone. Cloning
+    doesn't hold the mirror lock: git allows reads while another process fetches.
+    """
+    path = update_mirror(organization, repository)
+    git("clone", "--quiet", "--branch", branch, path, dest)
+    git("remote", "set-url", "origin", repo_url(organization, repository), cwd=dest)
+    return dest
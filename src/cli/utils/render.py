@@ -0,0 +1,414 @@
+import os
+import shutil
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional
+from .cache import cache_dir
+from .cache_index import record_access
+from .fastcopy import copy_file as fast_copy_file, copy_tree, merge_stats, take_stats
+
+# "parallel": our multi-process renderer; "cookiecutter": cookiecutter's own sequential one
+RENDER_MODES = ("parallel", "cookiecutter")
+DEFAULT_RENDER_MODE = "parallel"
+# Starting worker processes costs a few hundred ms, only worth it for large templates
+PARALLEL_MIN_FILES = 200
+# Files are handed to the workers in about this many chunks per worker, to balance them
+CHUNKS_PER_WORKER = 4
+
+_install_lock = threading.Lock()
+_original_generate_files = None
+# Per thread: context of the last generate_files() call, and the archive to write to and
+# links setting of the current one, see run_cookiecutter()
+_rendered = threading.local()
+
+
+def render_mode() -> str:
+    mode = os.environ.get("A3T_RENDER", DEFAULT_RENDER_MODE)
+    if mode not in RENDER_MODES:
+        raise ValueError(f"Modo de renderização desconhecido: {mode} (use {', '.join(RENDER_MODES)})")
+    return mode
+
+
+def render_workers() -> int:
+    """Processes rendering one template (A3T_RENDER_WORKERS, default: number of CPUs)"""
+    try:
+        return max(1, int(os.environ.get("A3T_RENDER_WORKERS", 0)) or os.cpu_count() or 1)
+    except ValueError:
+        return os.cpu_count() or 1
+
+
+class _DirectoryOutput:
+    """Generated files written under the project dir, as cookiecutter does"""
+
+    def __init__(self, project_dir: str, skip_if_file_exists: bool, links: Optional[bool] = None):
+        self.project_dir = project_dir
+        self.skip_if_file_exists = skip_if_file_exists
+        self.links = links
+
+    def skip(self, relpath: str) -> bool:
+        outfile = os.path.join(self.project_dir, relpath)
+        # A directory: the file name rendered empty
+        return os.path.isdir(outfile) or (self.skip_if_file_exists and os.path.exists(outfile))
+
+    def copy(self, source: str, relpath: str, mode_source: str) -> None:
+        outfile = os.path.join(self.project_dir, relpath)
+        fast_copy_file(source, outfile, metadata="", links=self.links)
+        shutil.copymode(mode_source, outfile)
+
+    def write(self, relpath: str, data: bytes, mode_source: str) -> None:
+        outfile = os.path.join(self.project_dir, relpath)
+        with open(outfile, "wb") as file:
+            file.write(data)
+        shutil.copymode(mode_source, outfile)
+
+
+class _ArchiveOutput:
+    """Generated files collected as archive members: (relpath, source file or None, data, mode).
+
+    Workers hand these back to the process writing the archive; copied files are
+    passed by path and only read when added.
+    """
+
+    def __init__(self):
+        self.entries = []
+
+    def skip(self, relpath: str) -> bool:
+        return not os.path.basename(relpath)
+
+    def copy(self, source: str, relpath: str, mode_source: str) -> None:
+        self.entries.append((relpath, os.path.abspath(source), None, _mode(mode_source)))
+
+    def write(self, relpath: str, data: bytes, mode_source: str) -> None:
+        self.entries.append((relpath, None, data, _mode(mode_source)))
+
+
+def _mode(path: str) -> int:
+    return os.stat(path).st_mode & 0o7777
+
+
+def _encode(text: str, newline: Optional[str]) -> bytes:
+    """`text` as written by open(..., "w", encoding="utf-8", newline=newline)"""
+    if newline is None:
+        newline = os.linesep
+    if newline not in ("", "\n"):
+        text = text.replace("\n", newline)
+    return text.encode("utf-8")
+
+
+def _generate_file(infile: str, context: dict, env, memo, output) -> None:
+    """cookiecutter.generate.generate_file, reusing the output of an earlier identical render.
+
+    Name rendering, binary files, newline handling and file modes are the same as
+    cookiecutter's; only the rendering of the contents may be replaced by a copy
+    from `memo` (a jinja_cache.RenderMemo). Files go to `output`: the project dir,
+    or an archive.
+    """
+    from binaryornot.check import is_binary
+    from jinja2.exceptions import TemplateSyntaxError
+
+    relpath = env.from_string(infile).render(**context)
+    if output.skip(relpath):
+        return
+    if is_binary(infile):
+        output.copy(infile, relpath, infile)
+        return
+
+    with open(infile, encoding="utf-8") as file:
+        file.readline()  # like cookiecutter, the newline of the first line is kept
+        detected = file.newlines[0] if isinstance(file.newlines, tuple) else file.newlines
+        file.seek(0)
+        source = file.read()
+    newline = context["cookiecutter"].get("_new_lines", False) or detected
+
+    key = memo.key(source, context, newline)
+    if key and os.path.exists(memo.path(key)):
+        output.copy(memo.path(key), relpath, infile)
+        return
+    try:
+        tmpl = env.get_template(infile.replace(os.path.sep, "/"))
+    except TemplateSyntaxError as exception:
+        exception.translated = False
+        raise
+    data = _encode(tmpl.render(**context), newline)
+    output.write(relpath, data, infile)
+    if key:
+        memo.store(key, data)
+
+
+def _render_files(
+    template_dir: str,
+    project_dir: Optional[str],
+    context: dict,
+    files: list[str],
+    skip_if_file_exists: bool,
+    links: Optional[bool] = None,
+):
+    """Render `files`, returning (file, error) for the first undefined variable found, the copy stats
+    and, without a `project_dir` (rendering into an archive), the archive entries.
+
+    Runs in the worker processes (or inline for small templates), each with its own
+    Jinja environment, relative to the template dir like cookiecutter does.
+    """
+    from jinja2 import FileSystemLoader
+    from jinja2.exceptions import UndefinedError
+    from cookiecutter.utils import create_env_with_context, work_in
+    from .jinja_cache import RenderMemo, enable_bytecode_cache
+
+    env = create_env_with_context(context)
+    enable_bytecode_cache(env, template_dir)
+    memo = RenderMemo(env, template_dir)
+    output = _DirectoryOutput(project_dir, skip_if_file_exists, links) if project_dir else _ArchiveOutput()
+    entries = getattr(output, "entries", None)
+    try:
+        with work_in(template_dir):
+            env.loader = FileSystemLoader([".", "../templates"])
+            for infile in files:
+                try:
+                    _generate_file(infile, context, env, memo, output)
+                except UndefinedError as err:
+                    return (infile, err), take_stats(), entries
+    finally:
+        memo.save()
+    return None, take_stats(), entries
+
+
+def generate_files(
+    repo_dir,
+    context=None,
+    output_dir=".",
+    overwrite_if_exists=False,
+    skip_if_file_exists=False,
+    accept_hooks=True,
+    keep_project_on_failure=False,
+    archive=None,
+    links=None,
+):
+    """cookiecutter.generate.generate_files, rendering files on a process pool.
+
+    The template tree is walked once, in the same order as cookiecutter, rendering
+    and creating directories on the way. Then `_copy_without_render` paths are
+    copied on threads (copying releases the GIL) while file names and contents are
+    rendered by worker processes (Jinja rendering is CPU bound) with _render_files:
+    each worker builds one Jinja environment for its chunk and renders every file
+    through _generate_file, our port of cookiecutter's generate_file that consults
+    the render memo first. Hooks, binary files and the cleanup on failure behave
+    as in cookiecutter; copied and binary files go through fastcopy (reflinks,
+    in-kernel copies) instead of being read and written by Python.
+
+    Compiled Jinja code is kept in a bytecode cache per template dir (see
+    jinja_cache), so builds of an already rendered snapshot skip compilation, and
+    files whose referenced variables have the same values as in an earlier build
+    are copied from the render memo instead of rendered.
+
+    With `archive` (an archive.ArchiveWriter) nothing is written to `output_dir`:
+    directories, copies and rendered files are added to the archive as they are
+    produced, and the project name is returned. Hooks aren't run in that case, see
+    _dispatch_generate_files() for templates that have them.
+
+    `links` is passed to fastcopy: True hardlinks copied files from the template
+    cache, for output that is only read (see update.py).
+    """
+    from collections import OrderedDict
+    from jinja2.exceptions import UndefinedError
+    from cookiecutter.exceptions import UndefinedVariableInTemplate
+    from cookiecutter.find import find_template
+    from cookiecutter.generate import is_copy_only_path, render_and_create_dir
+    from cookiecutter.hooks import run_hook_from_repo_dir
+    from cookiecutter.utils import create_env_with_context, rmtree, work_in
+    from .jinja_cache import enable_bytecode_cache, template_cache_key
+
+    context = context or OrderedDict([])
+    env = create_env_with_context(context)
+    template_dir = os.path.abspath(find_template(repo_dir, env))
+    bytecode_dir = enable_bytecode_cache(env, template_dir)
+    # Entries are content addressed and never rewritten, so a build wrote to a cache iff its count grew
+    bytecode_entries = len(os.listdir(bytecode_dir))
+    renders_dir = cache_dir("renders", template_cache_key(env, template_dir))
+    renders_entries = len(os.listdir(renders_dir))
+    if archive is not None:
+        accept_hooks = False
+
+    unrendered_dir = os.path.split(template_dir)[1]
+    try:
+        if archive is None:
+            project_dir, output_directory_created = render_and_create_dir(
+                unrendered_dir, context, output_dir, env, overwrite_if_exists
+            )
+        else:
+            project_dir, output_directory_created = env.from_string(unrendered_dir).render(**context), False
+            archive.add_dir(project_dir)
+    except UndefinedError as err:
+        raise UndefinedVariableInTemplate(f"Unable to create project directory '{unrendered_dir}'", err, context) from err
+
+    if archive is None:
+        project_dir = os.path.abspath(project_dir)
+    delete_project_on_failure = output_directory_created and not keep_project_on_failure
+
+    if accept_hooks:
+        run_hook_from_repo_dir(repo_dir, "pre_gen_project", project_dir, context, delete_project_on_failure)
+
+    def copy_dir(indir: str) -> None:
+        if archive is not None:
+            # Links followed, like copy_tree() below
+            archive.add_tree(os.path.join(template_dir, indir), f"{project_dir}/{env.from_string(indir).render(**context)}", symlinks=False)
+            return
+        outdir = env.from_string(os.path.normpath(os.path.join(project_dir, indir))).render(**context)
+        if os.path.isdir(outdir):
+            shutil.rmtree(outdir)
+        copy_tree(os.path.join(template_dir, indir), outdir, links=links)
+
+    def copy_file(infile: str) -> None:
+        relpath = env.from_string(infile).render(**context)
+        if archive is not None:
+            archive.add_file(f"{project_dir}/{relpath}", os.path.join(template_dir, infile))
+            return
+        fast_copy_file(os.path.join(template_dir, infile), os.path.join(project_dir, relpath), links=links)
+
+    try:
+        copies, files = [], []
+        with work_in(template_dir):
+            for root, dirs, walk_files in os.walk("."):
+                render_dirs = []
+                for d in dirs:
+                    indir = os.path.normpath(os.path.join(root, d))
+                    if is_copy_only_path(indir, context):
+                        copies.append((copy_dir, indir))
+                    else:
+                        render_dirs.append(d)
+                # Only descend into the directories that are rendered, not copied
+                dirs[:] = render_dirs
+                for d in dirs:
+                    if archive is not None:
+                        indir = os.path.normpath(os.path.join(root, d))
+                        try:
+                            archive.add_dir(f"{project_dir}/{env.from_string(indir).render(**context)}")
+                        except UndefinedError as err:
+                            raise UndefinedVariableInTemplate(f"Unable to create directory '{indir}'", err, context) from err
+                        continue
+                    unrendered_dir = os.path.join(project_dir, root, d)
+                    try:
+                        render_and_create_dir(unrendered_dir, context, output_dir, env, overwrite_if_exists)
+                    except UndefinedError as err:
+                        _dir = os.path.relpath(unrendered_dir, output_dir)
+                        raise UndefinedVariableInTemplate(f"Unable to create directory '{_dir}'", err, context) from err
+                for f in walk_files:
+                    infile = os.path.normpath(os.path.join(root, f))
+                    if is_copy_only_path(infile, context):
+                        copies.append((copy_file, infile))
+                    else:
+                        files.append(infile)
+
+        # Into an archive, workers return entries instead of writing files (see _ArchiveOutput)
+        target_dir = project_dir if archive is None else None
+        workers = render_workers() if len(files) >= PARALLEL_MIN_FILES else 1
+        # The archive has a single writer, so copies into it aren't run on threads
+        with ThreadPoolExecutor(max_workers=1 if archive is not None else None, thread_name_prefix="a3t-copy") as copier:
+            copy_futures = [copier.submit(func, path) for func, path in copies]
+            if workers == 1:
+                results = [_render_files(template_dir, target_dir, context, files, skip_if_file_exists, links)]
+            else:
+                size = -(-len(files) // (workers * CHUNKS_PER_WORKER))
+                chunks = [files[i:i + size] for i in range(0, len(files), size)]
+                # spawn: the CLI runs background threads, which don't survive a fork safely
+                with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn")) as pool:
+                    results = list(pool.map(
+                        _render_files,
+                        *zip(*[(template_dir, target_dir, context, chunk, skip_if_file_exists, links) for chunk in chunks]),
+                    ))
+            for future in copy_futures:
+                future.result()
+        for _, stats, _ in results:
+            merge_stats(stats)
+        # Chunks are in walk order, so the first failure is the one cookiecutter would report
+        for failure, _, _ in results:
+            if failure:
+                infile, err = failure
+                raise UndefinedVariableInTemplate(f"Unable to create file '{infile}'", err, context) from err
+        if archive is not None:
+            for _, _, entries in results:
+                for relpath, source, data, mode in entries:
+                    if source is not None:
+                        archive.add_file(f"{project_dir}/{relpath}", source, mode)
+                    else:
+                        archive.add_bytes(f"{project_dir}/{relpath}", data, mode)
+    except UndefinedVariableInTemplate:
+        # Like cookiecutter, only undefined variables remove the half-generated project
+        if delete_project_on_failure:
+            rmtree(project_dir)
+        raise
+
+    record_access("jinja", bytecode_dir, hit=bytecode_entries > 0, origin=template_dir,
+                  changed=len(os.listdir(bytecode_dir)) != bytecode_entries)
+    record_access("renders", renders_dir, hit=renders_entries > 0, origin=template_dir,
+                  changed=len(os.listdir(renders_dir)) != renders_entries)
+
+    if accept_hooks:
+        run_hook_from_repo_dir(repo_dir, "post_gen_project", project_dir, context, delete_project_on_failure)
+    return project_dir
+
+
+def _has_hooks(repo_dir: str) -> bool:
+    from cookiecutter.hooks import find_hook
+    from cookiecutter.utils import work_in
+
+    with work_in(repo_dir):
+        return any(find_hook(hook) for hook in ("pre_gen_project", "post_gen_project"))
+
+
+def _dispatch_generate_files(*args, **kwargs):
+    _rendered.context = kwargs.get("context")
+    archive = getattr(_rendered, "archive", None)
+    generate = _original_generate_files if render_mode() == "cookiecutter" else generate_files
+    if archive is None:
+        if generate is generate_files:
+            kwargs["links"] = getattr(_rendered, "links", None)
+        return generate(*args, **kwargs)
+    if generate is generate_files and not (kwargs.get("accept_hooks", True) and _has_hooks(kwargs["repo_dir"])):
+        return generate_files(*args, archive=archive, **kwargs)
+    # Hooks work on (and cookiecutter's own renderer writes to) real files: generate in a scratch dir
+    scratch = tempfile.mkdtemp(prefix="a3t-archive-")
+    try:
+        project_dir = generate(*args, **{**kwargs, "output_dir": scratch})
+        name = os.path.basename(project_dir)
+        archive.add_tree(project_dir, name)
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+    return name
+
+
+def install() -> None:
+    """Make cookiecutter() render through generate_files() above (according to A3T_RENDER)"""
+    global _original_generate_files
+    import cookiecutter.main
+
+    with _install_lock:
+        if _original_generate_files is None:
+            _original_generate_files = cookiecutter.main.generate_files
+            cookiecutter.main.generate_files = _dispatch_generate_files
+
+
+def run_cookiecutter(template: str, archive=None, links: Optional[bool] = None, **kwargs) -> tuple[str, dict]:
+    """cookiecutter(template, **kwargs), rendered by the engine selected with A3T_RENDER.
+
+    Returns the project dir and the answers it was rendered with: the template
+    variables after prompts, defaults and `extra_context`, without the private
+    `_` ones. cookiecutter itself only returns the dir.
+
+    With `archive` (an archive.ArchiveWriter) the project is written into it
+    instead of `output_dir`, and the project name is returned instead of a dir.
+    `links` is handed to generate_files() (this call only, unlike A3T_COPY_LINKS).
+    """
+    from cookiecutter.main import cookiecutter
+
+    render_mode()  # fail early on an unknown mode
+    install()
+    _rendered.context, _rendered.archive, _rendered.links = None, archive, links
+    try:
+        project_dir = cookiecutter(template, **kwargs)
+    finally:
+        _rendered.archive = _rendered.links = None
+    context = (_rendered.context or {}).get("cookiecutter", {})
+    answers = {key: value for key, value in context.items() if not key.startswith("_")}
+    return project_dir, answers
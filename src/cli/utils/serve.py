@@ -0,0 +1,325 @@
+import os
+import sys
+import hmac
+import json
+import time
+import secrets
+import tempfile
+import threading
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from urllib.parse import urlsplit, unquote
+from .catalog import catalog_ttl
+from .credentials import get_credentials
+from .telemetry import send_telemetry
+from .template import load_catalog
+from .template.abs import GitHubAuthError
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+# Builds running at the same time (A3T_SERVE_WORKERS, default: number of CPUs)
+DEFAULT_WORKERS = os.cpu_count() or 1
+# Builds waiting for a worker, per worker, before new ones are refused with 503
+QUEUE_PER_WORKER = 4
+# Largest request body accepted (answers are small JSON objects)
+MAX_BODY_SIZE = 1 << 20
+# Host names a browser uses for the loopback interface, accepted in the Host header
+LOOPBACK_HOSTS = ("127.0.0.1", "localhost", "[::1]")
+# Bind addresses on every interface: the Host header can't be checked against them
+WILDCARD_HOSTS = ("", "0.0.0.0", "::")
+CONTENT_TYPES = {"tar.gz": "application/gzip", "tar.zst": "application/zstd", "tar": "application/x-tar", "zip": "application/zip"}
+
+
+class ServiceError(Exception):
+    """Request error reported to the client with an HTTP status"""
+
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+def serve_workers() -> int:
+    try:
+        return max(1, int(os.environ.get("A3T_SERVE_WORKERS", 0)) or DEFAULT_WORKERS)
+    except ValueError:
+        return DEFAULT_WORKERS
+
+
+def serve_token() -> str:
+    """Token clients must send (A3T_SERVE_TOKEN, default: a new random one per run)"""
+    return os.environ.get("A3T_SERVE_TOKEN") or secrets.token_urlsafe(24)
+
+
+def _init_worker() -> None:
+    from . import batch
+
+    batch._init_worker()
+    # Paid once per worker instead of once per build
+    from .render import install
+
+    install()
+
+
+def _build_archive_job(template, options: dict, path: str, fmt: str) -> dict:
+    """Build `template` into the archive at `path`; executed in a worker process"""
+    from . import archive
+
+    start = time.perf_counter()
+    with archive.open_archive(path, fmt) as writer:
+        template.build_archive(template.encode_input(options), writer)
+    return {"status": "ok", "files": writer.files, "seconds": round(time.perf_counter() - start, 3)}
+
+
+class GenerationService:
+    """State kept between requests by `a3t serve`.
+
+    The parsed catalog (with head commits and access from a single GraphQL query),
+    the credentials and the HTTP session stay in this process; the catalog is
+    reloaded when older than A3T_CATALOG_TTL, keeping the last one if that fails.
+    Sources are resolved here, so the worker processes only render from the local
+    snapshots. Workers are started once, with cookiecutter and Jinja imported, and
+    keep the compiled code of the templates they rendered in memory.
+    """
+
+    def __init__(self, workers: int):
+        self.workers = workers
+        self._templates = []
+        self._loaded_at = 0.0
+        self._catalog_lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(workers * (1 + QUEUE_PER_WORKER))
+        # spawn: the HTTP server threads don't survive a fork safely
+        self._pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"), initializer=_init_worker)
+
+    def start(self) -> None:
+        """Load the catalog and credentials and start the workers before the first request"""
+        get_credentials()
+        self.templates()
+        for future in [self._pool.submit(os.getpid) for _ in range(self.workers)]:
+            future.result()
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def templates(self) -> list:
+        with self._catalog_lock:
+            if not self._templates or time.time() - self._loaded_at >= catalog_ttl():
+                try:
+                    self._templates = load_catalog()
+                except Exception as e:
+                    if not self._templates:
+                        raise
+                    print(f"Falha ao atualizar o catálogo, usando o anterior: {e}", file=sys.stderr)
+                self._loaded_at = time.time()
+            return self._templates
+
+    def template(self, ref: str):
+        """Template by ID (as in `a3t list`) or by name"""
+        templates = self.templates()
+        if ref.isdigit() and int(ref) < len(templates):
+            return templates[int(ref)]
+        for template in templates:
+            if template.config.name == ref:
+                return template
+        raise ServiceError(404, f"Template não encontrado: {ref}")
+
+    def list_templates(self) -> list[dict]:
+        return [
+            {
+                "id": idx,
+                **t.config.__dict__,
+                "accessible": t.remote.accessible if t.remote else None,
+                "head_commit": t.remote.commit if t.remote else None,
+            }
+            for idx, t in enumerate(self.templates())
+        ]
+
+    def options(self, ref: str) -> dict:
+        return self.template(ref).get_template_options()
+
+    def _submit(self, template, options: dict, func, *args) -> dict:
+        if template.config.type == "cookiecutter" and not options:
+            # Without answers cookiecutter would prompt, and workers have no terminal
+            raise ServiceError(400, "Informe ao menos uma resposta em options (as demais usam o padrão do template).")
+        if not template.is_available():
+            raise ServiceError(403, "Template não disponível ou não encontrado.")
+        if not self._slots.acquire(blocking=False):
+            raise ServiceError(503, "Muitas gerações em andamento, tente novamente em instantes.")
+        metadata = {
+            "organization": template.config.organization,
+            "repository": template.config.repository,
+            "branch": template.config.branch,
+        }
+        try:
+            # Commit and snapshot are resolved here, with the warm HTTP session, and pickled with the template
+            template._fetch_sources()
+            result = self._pool.submit(func, template, *args).result()
+        except Exception as e:
+            send_telemetry(template.config.name, metadata={**metadata, "error": str(e)}, code="ERROR_GENERATING_TEMPLATE")
+            raise
+        finally:
+            self._slots.release()
+        if result.get("status", "ok") != "ok":
+            send_telemetry(template.config.name, metadata={**metadata, "error": result["error"]}, code="ERROR_GENERATING_TEMPLATE")
+            raise ServiceError(500, result["error"])
+        send_telemetry(template.config.name, metadata=metadata, code="TEMPLATE_GENERATED")
+        return result
+
+    def build(self, ref: str, options: dict, output_dir: str) -> dict:
+        """Generate the project into `output_dir` on this machine"""
+        from . import batch
+
+        template = self.template(ref)
+        job = {"id": template.config.name, "options": options, "output_dir": output_dir}
+        return self._submit(template, options, batch._build_job, job)
+
+    def build_archive(self, ref: str, options: dict, fmt: str) -> tuple[str, str]:
+        """Generate the project into a temporary archive: its path and the template name.
+
+        The caller sends the archive and removes it.
+        """
+        template = self.template(ref)
+        fd, path = tempfile.mkstemp(prefix="a3t-serve-", suffix=f".{fmt}")
+        os.close(fd)
+        try:
+            self._submit(template, options, _build_archive_job, options, path, fmt)
+            return path, template.config.name
+        except BaseException:
+            os.remove(path)
+            raise
+
+
+def _handler(service: GenerationService, token: str, allowed_hosts: set[str]):
+    """Request handler class of the API.
+
+    Every route but /health needs `Authorization: Bearer <token>`. Requests are
+    also refused when their Host isn't one of `allowed_hosts` (DNS rebinding,
+    unless bound to every interface), when a browser sends them from another
+    origin, or, for POST, when the body isn't declared as JSON: a plain HTML form
+    or a text/plain fetch() can't trigger a build without a CORS preflight.
+    """
+    from http.server import BaseHTTPRequestHandler
+
+    class Handler(BaseHTTPRequestHandler):
+        # Keep-alive, so a portal reuses its connections
+        protocol_version = "HTTP/1.1"
+
+        def _send_json(self, status: int, data) -> None:
+            body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_file(self, path: str, fmt: str, name: str) -> None:
+            with open(path, "rb") as file:
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPES[fmt])
+                self.send_header("Content-Length", str(os.fstat(file.fileno()).st_size))
+                self.send_header("Content-Disposition", f'attachment; filename="{name}.{fmt}"')
+                self.end_headers()
+                self.connection.sendfile(file)
+
+        def _check_request(self, method: str, parts: list[str]) -> None:
+            host = self.headers.get("Host", "")
+            if allowed_hosts and host not in allowed_hosts:
+                raise ServiceError(403, f"Host não permitido: {host}")
+            origin = self.headers.get("Origin")
+            if origin is not None and origin != f"http://{host}":
+                raise ServiceError(403, f"Origem não permitida: {origin}")
+            if parts == ["health"]:
+                return
+            scheme, _, credentials = self.headers.get("Authorization", "").partition(" ")
+            if scheme.lower() != "bearer" or not hmac.compare_digest(credentials.strip().encode(), token.encode()):
+                raise ServiceError(401, "Token ausente ou inválido: envie Authorization: Bearer <token> (mostrado ao iniciar o a3t serve).")
+            content_type = self.headers.get("Content-Type", "").split(";")[0].strip().lower()
+            if method == "POST" and content_type != "application/json":
+                raise ServiceError(415, "Envie o corpo como Content-Type: application/json.")
+
+        def _read_json(self) -> dict:
+            length = int(self.headers.get("Content-Length") or 0)
+            if length > MAX_BODY_SIZE:
+                raise ServiceError(413, "Corpo da requisição muito grande.")
+            try:
+                data = json.loads(self.rfile.read(length) or b"{}")
+            except ValueError as e:
+                raise ServiceError(400, f"JSON inválido: {e}")
+            if not isinstance(data, dict) or not isinstance(data.get("options", {}), dict):
+                raise ServiceError(400, 'Esperado {"options": {...}, "format": "...", "output_dir": "..."}')
+            return data
+
+        def _route(self, method: str) -> None:
+            parts = [unquote(part) for part in urlsplit(self.path).path.strip("/").split("/")]
+            self._check_request(method, parts)
+            if method == "GET" and parts == ["health"]:
+                self._send_json(200, {"status": "ok", "workers": service.workers})
+            elif method == "GET" and parts == ["templates"]:
+                self._send_json(200, service.list_templates())
+            elif method == "GET" and len(parts) == 3 and parts[0] == "templates" and parts[2] == "options":
+                self._send_json(200, service.options(parts[1]))
+            elif method == "POST" and len(parts) == 3 and parts[0] == "templates" and parts[2] == "build":
+                self._build(parts[1], self._read_json())
+            else:
+                raise ServiceError(404, f"Rota não encontrada: {method} {self.path}")
+
+        def _build(self, ref: str, data: dict) -> None:
+            from . import archive
+
+            options = data.get("options", {})
+            if data.get("output_dir"):
+                self._send_json(200, service.build(ref, options, data["output_dir"]))
+                return
+            try:
+                fmt = archive.archive_format("-", data.get("format", ""))
+            except ValueError as e:
+                raise ServiceError(400, str(e))
+            path, name = service.build_archive(ref, options, fmt)
+            try:
+                self._send_file(path, fmt, name)
+            finally:
+                os.remove(path)
+
+        def _handle(self, method: str) -> None:
+            try:
+                self._route(method)
+            except ServiceError as e:
+                self._send_json(e.status, {"error": str(e)})
+            except GitHubAuthError as e:
+                self._send_json(401, {"error": str(e)})
+            except ConnectionError:
+                self.close_connection = True  # the client went away
+            except Exception as e:
+                self._send_json(500, {"error": str(e)})
+
+        def do_GET(self) -> None:
+            self._handle("GET")
+
+        def do_POST(self) -> None:
+            self._handle("POST")
+
+    return Handler
+
+
+def serve(host: str = DEFAULT_HOST, port: int = DEFAULT_PORT, workers: int = 0, ready=None) -> None:
+    """Serve the generation API until interrupted.
+
+    `ready(url, token)` is called once it accepts requests, with the token clients must send.
+    """
+    from http.server import ThreadingHTTPServer
+
+    token = serve_token()
+    service = GenerationService(workers or serve_workers())
+    try:
+        service.start()
+        with ThreadingHTTPServer((host, port), None) as server:
+            port = server.server_address[1]
+            allowed_hosts = set() if host in WILDCARD_HOSTS else {f"{name}:{port}" for name in {host, *LOOPBACK_HOSTS}}
+            server.RequestHandlerClass = _handler(service, token, allowed_hosts)
+            if ready is not None:
+                ready(f"http://{host}:{port}", token)
+            try:
+                server.serve_forever()
+            except KeyboardInterrupt:
+                pass
+    finally:
+        service.close()
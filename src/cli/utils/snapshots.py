@@ -0,0 +1,183 @@
+import os
+import re
+import time
+import shutil
+import hashlib
+from typing import Optional
+from . import github, http_client
+from .cache import cache_dir, load_json, store_json, temp_path
+from .cache_index import record_access
+from .credentials import github_headers
+from .fetch import fetch_repository
+from .filelock import file_lock
+
+_SHA_RE = re.compile(r"^[0-9a-f]{40}$")
+
+
+def _refs_path(organization: str, repository: str) -> str:
+    return os.path.join(cache_dir("refs", organization), f"{repository}.json")
+
+
+def resolve_commit(organization: str, repository: str, branch: str) -> str:
+    """Resolve `branch` to the commit SHA it currently points at.
+
+    This is the only request a branch-tracking template needs once its snapshot is
+    cached. The last answer is remembered, so the build still works from the cache
+    when GitHub can't be reached.
+    """
+    if _SHA_RE.match(branch):
+        return branch
+    refs_path = _refs_path(organization, repository)
+    refs = load_json(refs_path) or {}
+    url = f"https://api.github.com/repos/{organization}/{repository}/commits/{branch}"
+    headers = {**github_headers(), "Accept": "application/vnd.github.sha"}
+    import requests
+
+    try:
+        response = github.get(url, headers=headers)
+        response.raise_for_status()
+    except requests.RequestException:
+        if branch in refs:
+            return refs[branch]
+        raise
+    commit = response.text.strip()
+    remember_commit(organization, repository, branch, commit)
+    return commit
+
+
+def remember_commit(organization: str, repository: str, branch: str, commit: str) -> None:
+    """Record `commit` as the last known tip of `branch`, used when GitHub is unreachable"""
+    refs_path = _refs_path(organization, repository)
+    # Other processes may be recording other branches of the same repository
+    with file_lock(f"{refs_path}.lock"):
+        refs = load_json(refs_path) or {}
+        refs[branch] = commit
+        store_json(refs_path, refs)
+
+
+def _snapshot_key(commit: str, strategy: str, subdirectory: str) -> str:
+    # sparse and archive fetches only hold `subdirectory`, so they can't share an entry
+    if subdirectory and strategy in ("sparse", "archive"):
+        return f"{commit}-{hashlib.sha256(subdirectory.encode('utf-8')).hexdigest()[:8]}"
+    return commit
+
+
+def _cached_alternative(directory: str, commit: str, strategy: str, subdirectory: str) -> Optional[str]:
+    """Another cached tree of `commit` that holds `subdirectory`, used offline only.
+
+    A snapshot bundled with `a3t bundle export` under another strategy is keyed
+    differently; offline it is used rather than failing (the whole tree first, then
+    a tree of just `subdirectory`). Online each strategy keeps its own entry.
+    """
+    if not http_client.offline():
+        return None
+    candidates = [commit]
+    if subdirectory:
+        candidates.append(_snapshot_key(commit, "sparse", subdirectory))
+    for key in candidates:
+        path = os.path.join(directory, key)
+        if key != _snapshot_key(commit, strategy, subdirectory) and os.path.isdir(path):
+            return path
+    return None
+
+
+def get_snapshot(
+    organization: str,
+    repository: str,
+    branch: str,
+    commit: str,
+    strategy: str,
+    subdirectory: str = "",
+) -> str:
+    """Return the cached file tree of `organization/repository` at `commit`, fetching it once.
+
+    Entries are keyed by commit SHA, so they never change and never need to be
+    revalidated. The tree is stored without `.git`; metadata about how it was
+    fetched lives next to it in `<entry>.json`.
+
+    An entry only appears once complete (it is renamed into place), so readers
+    don't lock. Populating it takes a per-entry lock: concurrent builds of the same
+    commit fetch it once and the others wait and reuse it.
+    """
+    directory = cache_dir("snapshots", organization, repository)
+    path = os.path.join(directory, _snapshot_key(commit, strategy, subdirectory))
+    origin = f"{organization}/{repository}@{branch}"
+    if not os.path.isdir(path):
+        path = _cached_alternative(directory, commit, strategy, subdirectory) or path
+    if os.path.isdir(path):
+        record_access("snapshots", path, hit=True, origin=origin)
+        return path
+
+    if http_client.offline():
+        raise RuntimeError(
+            f"{organization}/{repository}@{commit[:7]} não está no cache (modo offline). "
+            "Gere um bundle com `a3t bundle export` em uma máquina com acesso ao GitHub."
+        )
+
+    with file_lock(f"{path}.lock"):
+        if os.path.isdir(path):  # fetched by another process while we waited
+            record_access("snapshots", path, hit=True, origin=origin)
+            return path
+        tmp_path = temp_path(path)
+        try:
+            fetch_repository(organization, repository, branch, tmp_path, strategy, subdirectory, commit=commit)
+            shutil.rmtree(os.path.join(tmp_path, ".git"), ignore_errors=True)
+            os.replace(tmp_path, path)
+        finally:
+            shutil.rmtree(tmp_path, ignore_errors=True)
+
+        store_json(f"{path}.json", {
+            "organization": organization,
+            "repository": repository,
+            "branch": branch,
+            "commit": commit,
+            "strategy": strategy,
+            "subdirectory": subdirectory,
+            "fetched_at": time.time(),
+        })
+        record_access("snapshots", path, hit=False, origin=origin)
+    return path
+
+
+def cached_file_path(organization: str, repository: str, commit: str, path: str) -> str:
+    key = hashlib.sha256(path.encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir("files", organization, repository, commit), key)
+
+
+def cached_file(organization: str, repository: str, commit: str, path: str, fetch) -> str:
+    """Return the content of `path` at `commit`, calling `fetch()` only on the first use"""
+    file_path = cached_file_path(organization, repository, commit, path)
+    origin = f"{organization}/{repository}:{path}"
+    try:
+        with open(file_path, "r", encoding="utf-8") as file:
+            content = file.read()
+        record_access("files", file_path, hit=True, origin=origin)
+        return content
+    except FileNotFoundError:
+        pass
+    # Concurrent misses may both fetch; each writes its own temporary file and the
+    # identical results replace each other atomically
+    content = fetch()
+    tmp_path = temp_path(file_path)
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(tmp_path, file_path)
+    record_access("files", file_path, hit=False, origin=origin)
+    return content
+
+
+def cached_template_file(template, path: str) -> str:
+    """Content of `path` in a template's repository at its resolved commit, cached per commit.
+
+    Shared by the TemplateClass of both CLIs. The options file comes from the catalog
+    GraphQL answer (`template.remote`) when there is one, instead of a download.
+    """
+    commit = template.resolved_commit()
+    remote = template.remote
+
+    def fetch() -> str:
+        if remote is not None and remote.config is not None and path == template.config.configPath:
+            return remote.config
+        return template._download_github_file(path, commit)
+
+    return cached_file(template.config.organization, template.config.repository, commit, path, fetch)
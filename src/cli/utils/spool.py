@@ -0,0 +1,91 @@
+import os
+import json
+from collections import Counter
+from .cache import temp_path
+from .filelock import file_lock
+
+# Spool size that triggers compaction; the oldest records are dropped first
+MAX_SPOOL_BYTES = 1024 * 1024
+
+
+class Spool:
+    """Append-only JSONL file shared between processes.
+
+    Writers append one record per line; a consumer reads batches from the head and
+    discards them once handled. All access goes through `<path>.lock`, so the data
+    file itself can be rewritten safely while other processes are waiting.
+    """
+
+    def __init__(self, path: str, max_bytes: int = MAX_SPOOL_BYTES):
+        self.path = path
+        self.lock_path = f"{path}.lock"
+        self.max_bytes = max_bytes
+
+    def append(self, record: dict) -> None:
+        line = json.dumps(record, separators=(",", ":")) + "\n"
+        with file_lock(self.lock_path):
+            with open(self.path, "a", encoding="utf-8") as file:
+                file.write(line)
+                size = file.tell()
+            if size > self.max_bytes:
+                self._compact()
+
+    def read_batch(self, limit: int) -> tuple[list[dict], list[str]]:
+        """Return up to `limit` records from the head and the raw lines they span"""
+        records, lines = [], []
+        with file_lock(self.lock_path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    for line in file:
+                        if len(records) >= limit:
+                            break
+                        lines.append(line)
+                        try:
+                            records.append(json.loads(line))
+                        except ValueError:
+                            continue  # torn or corrupt line, dropped with the batch
+            except FileNotFoundError:
+                pass
+        return records, lines
+
+    def discard(self, lines: list[str]) -> None:
+        """Remove the given lines, as returned by read_batch.
+
+        Lines are matched by content under the lock rather than by position, since
+        a compaction between read_batch and discard may have shifted the head;
+        lines that are no longer in the file are ignored.
+        """
+        if not lines:
+            return
+        pending = Counter(lines)
+        with file_lock(self.lock_path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as file:
+                    current = file.readlines()
+            except FileNotFoundError:
+                return
+            remaining = []
+            for line in current:
+                if pending[line] > 0:
+                    pending[line] -= 1
+                else:
+                    remaining.append(line)
+            if len(remaining) != len(current):
+                self._rewrite(remaining)
+
+    def _compact(self) -> None:
+        with open(self.path, "r", encoding="utf-8") as file:
+            lines = file.readlines()
+        kept, size = [], 0
+        for line in reversed(lines):
+            size += len(line.encode("utf-8"))
+            if size > self.max_bytes // 2:
+                break
+            kept.append(line)
+        self._rewrite(list(reversed(kept)))
+
+    def _rewrite(self, lines: list[str]) -> None:
+        tmp_path = temp_path(self.path)
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            file.writelines(lines)
+        os.replace(tmp_path, self.path)
@@ -0,0 +1,18 @@
+from typing import Any, Callable
+from .background import run_in_background
+
+
+class Startup:
+    """Runs independent startup steps (catalog fetch, credential and user info lookup,
+    tool probing...) concurrently, so the first prompt waits for the slowest one
+    instead of all of them in sequence.
+
+    Each task starts immediately; `result(name)` waits for it and re-raises its error.
+    Results nobody asks for are only used to warm the caches behind them.
+    """
+
+    def __init__(self, **tasks: Callable[[], Any]):
+        self._futures = {name: run_in_background(task) for name, task in tasks.items()}
+
+    def result(self, name: str) -> Any:
+        return self._futures[name].result()
@@ -1,54 +1,154 @@
-import requests
 import getpass
 import socket
 import platform
 import os
 import json
-import yaml
+import time
+import queue
+import atexit
+import random
+import threading
+import functools
+from . import http_client
+from .cache import cache_dir, load_json, store_json
+from .credentials import get_credentials
+from .filelock import file_lock
+from .spool import Spool
 
 TELEMETRY_ENDPOINT = "https://a3workflow.mtttecnologia.com.br/webhook/52ff1099-dbab-41a4-a1e1-4631467d3ec1"
+# Max seconds the process waits at exit for queued events to be sent
+FLUSH_TIMEOUT = 0.3
+# Max events sent in a single POST
+BATCH_SIZE = 100
+# Retry delay after a failed upload: BACKOFF_BASE * 2**failures, capped at BACKOFF_MAX seconds
+BACKOFF_BASE = 30
+BACKOFF_MAX = 6 * 60 * 60
+
+_queue: "queue.Queue[None]" = queue.Queue()
+_worker = None
+_worker_lock = threading.Lock()
 
 def username_github() -> str:
-    gh_config_path = os.path.expanduser("~/.config/gh/hosts.yml")
+    return get_credentials().user
+
+
+@functools.lru_cache(maxsize=None)
+def user_info() -> dict:
+    """Information about the machine/user attached to every event"""
+    return {
+        "user": getpass.getuser(),
+        "hostname": socket.gethostname(),
+        "platform": platform.platform(),
+        "github_username": username_github() or "unknown",
+    }
+
+
+def _spool() -> Spool:
+    return Spool(os.path.join(cache_dir("telemetry"), "events.jsonl"))
+
+
+def _post(events: list[dict]) -> None:
+    headers = {"Content-Type": "application/json"}
+    response = http_client.post(TELEMETRY_ENDPOINT, data=json.dumps(events), headers=headers, timeout=5)
+    response.raise_for_status()
+
+
+def upload_spool() -> None:
+    """Send spooled events in batches until the spool is empty or an upload fails.
+
+    Only one process uploads at a time; the others leave their events in the spool.
+    After a failure, uploads are skipped until the exponential backoff expires.
+    """
+    directory = cache_dir("telemetry")
+    state_path = os.path.join(directory, "state.json")
+    with file_lock(os.path.join(directory, "upload.lock"), blocking=False) as acquired:
+        if not acquired:
+            return
+        state = load_json(state_path) or {}
+        if time.time() < state.get("next_attempt", 0):
+            return
+        spool = _spool()
+        while True:
+            events, lines = spool.read_batch(BATCH_SIZE)
+            if not lines:
+                break
+            try:
+                if events:
+                    # Filled in here, off the caller's thread: resolving the GitHub user may run gh and git
+                    info = user_info()
+                    _post([{**event, "user_info": {**info, **event.get("user_info", {})}} for event in events])
+            except Exception:
+                failures = state.get("failures", 0) + 1
+                delay = min(BACKOFF_BASE * 2 ** (failures - 1), BACKOFF_MAX)
+                store_json(state_path, {
+                    "failures": failures,
+                    "next_attempt": time.time() + delay * random.uniform(0.5, 1.0),
+                })
+                return
+            spool.discard(lines)
+            if state:
+                state = {}
+                store_json(state_path, state)
 
-    if not os.path.exists(gh_config_path):
-        return None
 
-    with open(gh_config_path, "r") as file:
-        config = yaml.safe_load(file)
+def _run_worker() -> None:
+    while True:
+        _queue.get()
+        try:
+            upload_spool()
+        except Exception:
+            pass
+        finally:
+            _queue.task_done()
+
+
+def flush(timeout: float = FLUSH_TIMEOUT) -> bool:
+    """Wait up to `timeout` seconds for pending uploads. Returns False if some are still running.
+
+    Events that couldn't be sent stay in the spool and go out with a later run.
+    """
+    deadline = time.monotonic() + timeout
+    with _queue.all_tasks_done:
+        while _queue.unfinished_tasks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            _queue.all_tasks_done.wait(remaining)
+    return True
+
+
+def post_event(payload: dict) -> None:
+    """Write a telemetry payload to the on-disk spool and wake the background uploader.
+
+    The user_info() fields are added when the event is uploaded, by the uploader.
+    """
+    global _worker
+    payload.setdefault("timestamp", time.time())
+    try:
+        _spool().append(payload)
+    except OSError:
+        return
+    with _worker_lock:
+        if _worker is None:
+            _worker = threading.Thread(target=_run_worker, name="a3t-telemetry", daemon=True)
+            _worker.start()
+            atexit.register(flush)
+    _queue.put(None)
 
-    github_info = config.get("github.com")
-    # print(github_info)
-    if not github_info or "user" not in github_info:
-        return None
-    return github_info["user"]
 
 def send_telemetry(template_name, metadata=None, code=None):
     """
-    Sends telemetry data to the specified endpoint.
+    Queues telemetry data to be sent to the specified endpoint in the background.
     Args:
         template_name (str): Name of the template being used.
         metadata (dict, optional): Additional metadata to send.
         code (str, optional): Code or script content to send.
     """
-    user_info = {
-        "user": getpass.getuser(),
-        "hostname": socket.gethostname(),
-        "platform": platform.platform(),
-        "cwd": os.getcwd(),
-        "github_username": username_github() or "unknown",
-    }
     payload = {
-        "user_info": user_info,
+        "user_info": {"cwd": os.getcwd()},
         "template": template_name,
         "metadata": metadata or {},
         "code": code or ""
     }
-    headers = {"Content-Type": "application/json"}
-    try:
-        response = requests.post(TELEMETRY_ENDPOINT, data=json.dumps(payload), headers=headers, timeout=5)
-        response.raise_for_status()
-        
-        return response.json() if response.content else {"status": "success"}
-    except Exception as e:
-        return {"status": "error", "error": str(e)}
\ No newline at end of file
+    post_event(payload)
+    return {"status": "queued"}
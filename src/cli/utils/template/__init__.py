@@ -1,7 +1,4 @@
 import os
-import yaml
-import requests
-import base64
 from .abs import TemplateConfig, TemplateClass
 from .nix_template import NixTemplate
 from .cookiecutter import CookiecutterTemplate
@@ -12,25 +9,15 @@ GITHUB_REPO_NAME = "templates-cli"
 GITHUB_BRANCH = "main"  
 TEMPLATE_FILE_PATH = "templates.yaml"  
 CLI_VERSION = 0.6
+CATALOG_URL = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/contents/{TEMPLATE_FILE_PATH}?ref={GITHUB_BRANCH}"
 def get_github_templates() -> list[TemplateConfig]:
     """Fetch templates from GitHub repository"""
-    try:
-        # Fetch templates.yaml from GitHub
-        # TODO: add headers + accept type to skip base64 dencoding 
-        url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/contents/{TEMPLATE_FILE_PATH}?ref={GITHUB_BRANCH}"
-        response = requests.get(url)
-
-        if response.status_code == 401:
-            raise ValueError("Você não possui acesso a esse repositório ou não esta logado na conta do github. Execute `gh auth login` primeiro.")
-    
-        response.raise_for_status()
-                
-        content = response.json()
-        # Decode content from base64
-        file_content = base64.b64decode(content["content"]).decode("utf-8")
+    import requests
+    from ..catalog import fetch_catalog
 
-        # Parse YAML content
-        data = yaml.safe_load(file_content)
+    try:
+        # Fetch templates.yaml from GitHub (served from the local catalog cache when fresh)
+        data = fetch_catalog(CATALOG_URL)
         
         version = data.get("version",None)
         if version != CLI_VERSION:
@@ -51,6 +38,9 @@ def get_github_templates() -> list[TemplateConfig]:
                 repository=template["repository"],
                 branch=template.get("branch", GITHUB_BRANCH),
                 configPath=template.get("configPath", "config.yaml"),
+                fetch=template.get("fetch", ""),
+                subdirectory=template.get("subdirectory", ""),
+                commit=template.get("commit", ""),
             )
             for template in template_configs
         ]
@@ -93,3 +83,17 @@ def get_templates() -> list[TemplateClass]:
     return templates
 
 
+def enrich_templates(templates: list[TemplateClass]) -> None:
+    """Attach GitHub access, head commit and option file to every template with a single request"""
+    from ..graphql import fetch_remote_info
+
+    infos = fetch_remote_info([template.config for template in templates])
+    for template, info in zip(templates, infos):
+        template.remote = info
+
+
+def load_catalog() -> list[TemplateClass]:
+    """get_templates() followed by enrich_templates(), as used by listings and the picker"""
+    templates = get_templates()
+    enrich_templates(templates)
+    return templates
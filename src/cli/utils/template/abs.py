@@ -1,10 +1,14 @@
-import requests
-import yaml
 import os
-import typer
+import shutil
+import tempfile
 from abc import ABC, abstractmethod
 from dataclasses import dataclass
-from typing import Dict, Any
+from typing import TYPE_CHECKING, Dict, Any, Optional
+from ..credentials import get_credentials
+from ..background import run_in_background
+
+if TYPE_CHECKING:
+    from ..graphql import RemoteInfo
 
 
 @dataclass
@@ -17,6 +21,9 @@ class TemplateConfig:
     repository: str
     branch: str = "main"
     configPath: str = "config.yaml"
+    fetch: str = ""  # download strategy, see cli.utils.fetch.FETCH_STRATEGIES
+    subdirectory: str = ""  # template root inside the repository (sparse checkout target)
+    commit: str = ""  # pinned commit SHA; when empty the branch is resolved on use
 
 
 class GitHubAuthError(Exception):
@@ -25,18 +32,10 @@ class GitHubAuthError(Exception):
 
 
 def token_github() -> str:
-    gh_config_path = os.path.expanduser("~/.config/gh/hosts.yml")
-
-    if not os.path.exists(gh_config_path):
-        raise GitHubAuthError("Execute `gh auth login` primeiro.")
-
-    with open(gh_config_path, "r") as file:
-        config = yaml.safe_load(file)
-
-    github_info = config.get("github.com")
-    if not github_info or "oauth_token" not in github_info:
-        raise GitHubAuthError("Token OAuth não encontrado. Execute `gh auth login` primeiro.")
-    return github_info["oauth_token"]
+    token = get_credentials().token
+    if not token:
+        raise GitHubAuthError("Token do GitHub não encontrado. Execute `gh auth login` primeiro ou defina GH_TOKEN.")
+    return token
 
 
 class TemplateClass(ABC):
@@ -44,6 +43,10 @@ class TemplateClass(ABC):
 
     def __init__(self, config: TemplateConfig):
         self.config = config
+        self._commit = None
+        # Filled by enrich_templates() when the catalog is listed
+        self.remote: Optional["RemoteInfo"] = None
+        self._sources_future = None
 
     def __str__(self) -> str:
         """Pretty print representation of the template using rich markup"""
@@ -52,16 +55,69 @@ class TemplateClass(ABC):
             f"[green]{self.config.name}[/green] - "
             f"[cyan]{self.config.description}[/cyan] "
             f"<[yellow]{url}[/yellow]>"
+            + (" [red](sem acesso)[/red]" if self.remote and not self.remote.accessible else "")
         )
 
+    def resolved_commit(self) -> str:
+        """Commit SHA the template is built from: the pinned `commit`, or the current branch tip"""
+        if self._commit is None:
+            from ..snapshots import resolve_commit
+
+            if self.config.commit:
+                self._commit = self.config.commit
+            elif self.remote and self.remote.commit:
+                self._commit = self.remote.commit
+            else:
+                self._commit = resolve_commit(
+                    self.config.organization, self.config.repository, self.config.branch
+                )
+        return self._commit
+
+    def snapshot(self) -> str:
+        """Path of the cached file tree of the template at `resolved_commit()`"""
+        from ..fetch import resolve_strategy
+        from ..snapshots import get_snapshot
+
+        return get_snapshot(
+            self.config.organization,
+            self.config.repository,
+            self.config.branch,
+            self.resolved_commit(),
+            strategy=resolve_strategy(self.config.fetch),
+            subdirectory=self.config.subdirectory,
+        )
+
+    def _fetch_sources(self) -> Optional[str]:
+        """Download what build() needs from the network and return its local path (None if nothing)"""
+        return None
+
+    def prefetch(self) -> None:
+        """Start _fetch_sources() in the background, so the download overlaps with the prompts"""
+        if self._sources_future is None:
+            self._sources_future = run_in_background(self._fetch_sources)
+
+    def _sources(self) -> Optional[str]:
+        """Result of the prefetch started earlier (waiting for it if needed), or a download made now"""
+        future, self._sources_future = self._sources_future, None
+        if future is None:
+            return self._fetch_sources()
+        return future.result()
+
     def _fetch_github_file(self, path: str) -> str:
-        """Helper method to fetch files from GitHub"""
-        url = f"https://api.github.com/repos/{self.config.organization}/{self.config.repository}/contents/{path}?ref={self.config.branch}"
+        """Helper method to fetch files from GitHub, cached per commit"""
+        from ..snapshots import cached_template_file
+
+        return cached_template_file(self, path)
+
+    def _download_github_file(self, path: str, ref: str) -> str:
+        from .. import github
+
+        url = f"https://api.github.com/repos/{self.config.organization}/{self.config.repository}/contents/{path}?ref={ref}"
         headers = {
             "Authorization": f"Bearer {token_github()}",
             "Accept": "application/vnd.github.v3.raw",
         }
-        response = requests.get(url, headers=headers)
+        response = github.get(url, headers=headers)
         if response.status_code == 401:
             raise GitHubAuthError("Você não possui acesso a esse repositório ou não esta logado na conta do github. Execute `gh auth login` primeiro.")
     
@@ -76,6 +132,8 @@ class TemplateClass(ABC):
         Fetch template options from the repository
         Returns: Tuple of (options_dict, error_message)
         """
+        import yaml
+
         file_content = self._fetch_github_file(self.config.configPath)
         if not file_content:
             raise ValueError("Failed to fetch template options")
@@ -91,6 +149,26 @@ class TemplateClass(ABC):
     def build(self, config: str, output_dir: str) -> None:
         """Build the template and create it in the specified directory"""
         pass
+
+    def build_archive(self, config: str, archive) -> None:
+        """Build the template into `archive` (an archive.ArchiveWriter).
+
+        By default it is built in a scratch directory that is then archived;
+        templates that can write the archive directly override this.
+        """
+        scratch = tempfile.mkdtemp(prefix="a3t-archive-")
+        try:
+            self.build(config, scratch)
+            for name in sorted(os.listdir(scratch)):
+                path = os.path.join(scratch, name)
+                if os.path.islink(path):
+                    archive.add_symlink(name, os.readlink(path))
+                elif os.path.isdir(path):
+                    archive.add_tree(path, name)
+                else:
+                    archive.add_file(name, path)
+        finally:
+            shutil.rmtree(scratch, ignore_errors=True)
     
     @abstractmethod
     def is_available(self) -> bool:
@@ -1,5 +1,4 @@
 import json
-from cookiecutter.main import cookiecutter
 from .abs import TemplateConfig, TemplateClass
 
 class CookiecutterTemplate(TemplateClass):
@@ -12,18 +11,45 @@ class CookiecutterTemplate(TemplateClass):
 
     def build(self, config: str, output_dir: str) -> None:
         """Build the cookiecutter template"""
+        from ..render import run_cookiecutter
+        from ..update import write_provenance
+
         try:
             options = json.loads(config)
             no_input = options != {}
-            cookiecutter(
-                f"gh:{self.config.organization}/{self.config.repository}",
+            # cookiecutter (and jinja2) only load here, when a template is actually built
+            project_dir, answers = run_cookiecutter(
+                self._sources(),
                 no_input=no_input,
                 extra_context=options,
                 output_dir=output_dir,
-                checkout=self.config.branch,
+                directory=self.config.subdirectory or None,
             )
+            # Read by `a3t update` to bring the project to newer template revisions
+            write_provenance(project_dir, self.config, self.resolved_commit(), answers)
         except Exception as e:
             raise RuntimeError(f"Failed to build template: {str(e)}")
-    
+
+    def build_archive(self, config: str, archive) -> None:
+        """Render the template straight into `archive`, without writing the project to disk"""
+        from ..render import run_cookiecutter
+        from ..update import PROVENANCE_FILE, provenance_json
+
+        try:
+            options = json.loads(config)
+            name, answers = run_cookiecutter(
+                self._sources(),
+                archive=archive,
+                no_input=options != {},
+                extra_context=options,
+                directory=self.config.subdirectory or None,
+            )
+            archive.add_bytes(f"{name}/{PROVENANCE_FILE}", provenance_json(self.config, self.resolved_commit(), answers))
+        except Exception as e:
+            raise RuntimeError(f"Failed to build template: {str(e)}")
+
+    def _fetch_sources(self) -> str:
+        return self.snapshot()
+
     def is_available(self):
-        return True
+        return self.remote is None or self.remote.accessible
@@ -1,52 +1,68 @@
+import os
 import subprocess
 from typing import Dict, Any
 from .abs import TemplateClass
+from ..tools import tool_version
+from ..http_client import offline
 
 class NixTemplate(TemplateClass):
     def is_available(self):
         # if the template type is nix check if the nix command is available
-        if self.config.type == "nix":
-            try:
-                result = subprocess.run(["nix", "--version"], capture_output=True, text=True)
-                if result.returncode != 0:
-                    raise RuntimeError("Nix is not installed or not available in PATH")
-            except Exception as e:
-                raise RuntimeError(f"Failed to check Nix availability: {str(e)}")
+        if self.config.type == "nix" and tool_version("nix") is None:
+            raise RuntimeError("Nix is not installed or not available in PATH")
         return True
     
     def encode_input(self, collected_data) -> str:
         """Encodes the collected data into a Nix attribute set that will be used as the arguments for the derivation that builds the template"""
         return self._generate_nix_attr_set(collected_data)
 
+    def _nix_build(self, config: str) -> str:
+        """Build the derivation of the template and return its store path"""
+        # Create Nix expression
+        nix_expr = self._create_nix_expression(config)
+
+        # Run nix-build
+        result = subprocess.run(
+            ["nix", "build", "--impure", "--print-out-paths", "--expr", nix_expr],
+            capture_output=True,
+            text=True,
+        )
+
+        if result.returncode != 0:
+            raise RuntimeError(f"Nix build failed: {result.stderr}")
+        print("Nix result: ",result.stdout)
+        return result.stdout.strip()
+
     def build(self, config: str, output_dir: str) -> None:
         """Build the nix template"""
-        try:
-            # Create Nix expression
-            nix_expr = self._create_nix_expression(config)
+        from ..fastcopy import copy_file, copy_tree
 
-            # Run nix-build
-            result = subprocess.run(
-                ["nix", "build", "--impure", "--print-out-paths", "--expr", nix_expr],
-                capture_output=True,
-                text=True,
-            )
-
-            if result.returncode != 0:
-                raise RuntimeError(f"Nix build failed: {result.stderr}")
-            print("Nix result: ",result.stdout)
-            
-            build_dir = result.stdout.strip()
-            # Copy the built files to the output directory
-            subprocess.run(
-                ["cp", "-r", build_dir, output_dir],
-                check=True,
-            )
+        try:
+            build_dir = self._nix_build(config)
+            # Copy the built files to the output directory, like `cp -r`: into it when it exists.
+            # Store files keep their (read-only) modes but not their 1970 timestamps.
+            target = os.path.join(output_dir, os.path.basename(build_dir)) if os.path.isdir(output_dir) else output_dir
+            if os.path.isdir(build_dir):
+                copy_tree(build_dir, target, symlinks=True, metadata="mode")
+            else:
+                copy_file(build_dir, target, metadata="mode")
             print(f"Template built successfully in {output_dir}")
             
 
         except Exception as e:
             raise RuntimeError(f"Failed to build template: {str(e)}")
 
+    def build_archive(self, config: str, archive) -> None:
+        """Archive the build output straight from the Nix store"""
+        try:
+            build_dir = self._nix_build(config)
+            if os.path.isdir(build_dir):
+                archive.add_tree(build_dir, self.config.name)
+            else:
+                archive.add_file(self.config.name, build_dir)
+        except Exception as e:
+            raise RuntimeError(f"Failed to build template: {str(e)}")
+
     def _generate_nix_attr_set(self, data: Dict[str, Any]) -> str:
         """Convert dictionary to Nix attribute set"""
         nix_attrs = []
@@ -65,12 +81,18 @@ class NixTemplate(TemplateClass):
 
         return "{\n" + "\n".join(nix_attrs) + "\n}"
 
+    def _flake_ref(self) -> str:
+        # Offline (from a bundle) the flake is read from the cached snapshot instead of GitHub
+        if offline():
+            return f"path:{self.snapshot()}"
+        return f"github:{self.config.organization}/{self.config.repository}"
+
     def _create_nix_expression(self, attr_set: str) -> str:
         """Create complete Nix expression for building"""
         return f"""
         with import <nixpkgs> {{}};
         let
-            template = builtins.getFlake "github:{self.config.organization}/{self.config.repository}";
+            template = builtins.getFlake "{self._flake_ref()}";
             args = {attr_set};
         in
             template.packages.x86_64-linux.{self.config.name} args
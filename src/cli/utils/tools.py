@@ -0,0 +1,17 @@
+import functools
+import subprocess
+from typing import Optional
+
+
+@functools.lru_cache(maxsize=None)
+def tool_version(name: str) -> Optional[str]:
+    """`<name> --version` output, or None when the tool isn't installed or doesn't run"""
+    try:
+        result = subprocess.run([name, "--version"], capture_output=True, text=True)
+    except OSError:
+        return None
+    return result.stdout.strip() if result.returncode == 0 else None
+
+
+def probe_tools(names: tuple = ("git", "nix")) -> dict[str, Optional[str]]:
+    return {name: tool_version(name) for name in names}
@@ -2,11 +2,7 @@
 import sys
 from typing import List, Any, Callable, Optional, Union, Set, Dict
 from rich.console import Console
-from rich.markdown import Markdown
-from rich.syntax import Syntax
 from rich.panel import Panel
-from rich.prompt import Prompt, Confirm
-from rich.status import Status
 
 # Define color constants
 PRIMARY_COLOR = "blue"
@@ -47,6 +43,8 @@ def display_info(message: str, color: str = SECONDARY_COLOR) -> None:
 
 def display_code(code: str, language: str = "") -> None:
     """Display code with syntax highlighting"""
+    from rich.syntax import Syntax
+
     syntax = Syntax(code, language or "text", theme="monokai")
     console.print(syntax)
 
@@ -66,6 +64,8 @@ def get_string_option(
     Returns:
         tuple[str, bool]: The input value and whether input was successful
     """
+    from rich.prompt import Prompt
+
     try:
         # Show prompt with color
         console.print(f"[{SECONDARY_COLOR}]{prompt}[/]")
@@ -124,6 +124,8 @@ def get_checkbox_option(
     Returns:
         tuple[List[str], bool]: The selected options and whether selection was successful
     """
+    from rich.prompt import Prompt
+
     try:
         display_info(prompt, PRIMARY_COLOR)
         result = Prompt.ask(
@@ -147,6 +149,8 @@ def get_boolean_option(prompt: str, default: bool = False) -> tuple[bool, bool]:
     Returns:
         tuple[bool, bool]: The boolean value and whether input was successful
     """
+    from rich.prompt import Confirm
+
     try:
         result = Confirm.ask(prompt, default=default)
         return result, True
@@ -236,6 +240,8 @@ def display_spinner(
     message: str, action_func: Callable, *args: Any, **kwargs: Any
 ) -> Any:
     """Display a spinner while executing a function"""
+    from rich.status import Status
+
     with Status(message, spinner="dots") as status:
         try:
             result = action_func(*args, **kwargs)
@@ -248,6 +254,8 @@ def display_spinner(
 
 def display_format_markdown(markdown_text: str) -> None:
     """Display formatted markdown text"""
+    from rich.markdown import Markdown
+
     md = Markdown(markdown_text)
     console.print(md)
 
@@ -0,0 +1,249 @@
+import os
+import json
+import hashlib
+import tempfile
+import subprocess
+from dataclasses import replace
+from concurrent.futures import ThreadPoolExecutor
+from .fastcopy import copy_file
+from .render import run_cookiecutter
+
+# Written at the root of every generated cookiecutter project, read by `a3t update`
+PROVENANCE_FILE = ".a3t.json"
+PROVENANCE_VERSION = 1
+# Written next to a file when the project and the template changed it and it can't be merged
+CONFLICT_SUFFIX = ".a3t-new"
+
+
+def provenance_json(config, commit: str, answers: dict) -> bytes:
+    """Contents of the provenance file: which template, commit and answers a project was generated from.
+
+    No timestamps: regenerating or updating to the same commit leaves the file
+    unchanged, so it doesn't show up in the project's diffs.
+    """
+    data = {
+        "version": PROVENANCE_VERSION,
+        "template": config.name,
+        "type": config.type,
+        "organization": config.organization,
+        "repository": config.repository,
+        "branch": config.branch,
+        "subdirectory": config.subdirectory,
+        "commit": commit,
+        "answers": answers,
+    }
+    return (json.dumps(data, indent=2, ensure_ascii=False) + "\n").encode("utf-8")
+
+
+def write_provenance(project_dir: str, config, commit: str, answers: dict) -> None:
+    with open(os.path.join(project_dir, PROVENANCE_FILE), "wb") as file:
+        file.write(provenance_json(config, commit, answers))
+
+
+def read_provenance(project_dir: str) -> dict:
+    path = os.path.join(project_dir, PROVENANCE_FILE)
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            data = json.load(file)
+    except FileNotFoundError:
+        raise RuntimeError(f"{PROVENANCE_FILE} não encontrado em {os.path.abspath(project_dir)}: o projeto não foi gerado pelo a3t.")
+    except ValueError as e:
+        raise RuntimeError(f"{path} inválido: {e}")
+    if data.get("version") != PROVENANCE_VERSION:
+        raise RuntimeError(f"Versão de {PROVENANCE_FILE} não suportada: {data.get('version')}")
+    return data
+
+
+def find_template(templates: list, provenance: dict):
+    """Catalog entry the project was generated from: by name, or by repository if it was renamed"""
+    for template in templates:
+        if template.config.name == provenance["template"]:
+            return template
+    for template in templates:
+        config = template.config
+        if (config.organization, config.repository, config.subdirectory) == (
+            provenance["organization"], provenance["repository"], provenance["subdirectory"]
+        ):
+            return template
+    raise RuntimeError(f"Template {provenance['template']} não encontrado no catálogo.")
+
+
+def _file_hash(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _tree_hashes(root: str) -> dict[str, str]:
+    """sha256 of every file under `root` by relative path, leaving out .git and the provenance file"""
+    hashes = {}
+    for directory, dirs, files in os.walk(root):
+        dirs[:] = [d for d in dirs if d != ".git"]
+        for name in files:
+            path = os.path.join(directory, name)
+            relpath = os.path.relpath(path, root)
+            if relpath != PROVENANCE_FILE and not os.path.islink(path):
+                hashes[relpath] = _file_hash(path)
+    return hashes
+
+
+def _pinned(template, commit: str):
+    """Copy of `template` built from `commit` instead of its branch tip"""
+    return type(template)(replace(template.config, commit=commit))
+
+
+def _render(template, answers: dict, output_dir: str) -> tuple[str, dict]:
+    """Render `template` (from its snapshot) with `answers`, without prompts or hooks.
+
+    The renders are only read, so copied assets can be hardlinks to the snapshots.
+    """
+    return run_cookiecutter(
+        template.snapshot(),
+        no_input=True,
+        extra_context=answers,
+        output_dir=output_dir,
+        directory=template.config.subdirectory or None,
+        accept_hooks=False,
+        links=True,
+    )
+
+
+def _is_binary(*paths: str) -> bool:
+    from binaryornot.check import is_binary
+
+    return any(is_binary(path) for path in paths)
+
+
+def _merge_file(current: str, base: str, other: str, labels: tuple[str, str, str]) -> tuple[bytes, int]:
+    """Three-way merge with `git merge-file`: merged content and number of conflicts"""
+    command = ["git", "merge-file", "-p"]
+    for label in labels:
+        command += ["-L", label]
+    result = subprocess.run(command + [current, base, other], capture_output=True)
+    # The exit code is the number of conflicts (capped at 127), or negative on errors
+    if result.returncode > 127:
+        raise RuntimeError(f"git merge-file falhou: {result.stderr.decode(errors='replace').strip()}")
+    return result.stdout, result.returncode
+
+
+def _copy(source: str, target: str) -> None:
+    os.makedirs(os.path.dirname(target), exist_ok=True)
+    copy_file(source, target)
+
+
+def _remove(path: str, root: str) -> None:
+    """Remove `path` and the directories the removal left empty, up to `root`"""
+    os.remove(path)
+    directory = os.path.dirname(path)
+    while os.path.abspath(directory) != os.path.abspath(root) and not os.listdir(directory):
+        os.rmdir(directory)
+        directory = os.path.dirname(directory)
+
+
+def _dirty(project_dir: str) -> bool:
+    """Whether `project_dir` is in a git work tree with uncommitted changes"""
+    result = subprocess.run(["git", "status", "--porcelain", "--", "."], cwd=project_dir, capture_output=True, text=True)
+    return result.returncode == 0 and bool(result.stdout.strip())
+
+
+def _apply(project_dir: str, old_dir: str, new_dir: str, relpath: str, labels: tuple, dry_run: bool) -> str:
+    """Bring one file the template changed between the two renders into the project.
+
+    Returns what was done: added, updated, merged, conflict, removed, kept (changed
+    in the project, removed from the template) or skipped (removed from the project).
+    """
+    current, base, other = (os.path.join(d, relpath) for d in (project_dir, old_dir, new_dir))
+    in_project, in_base, in_other = os.path.isfile(current), os.path.isfile(base), os.path.isfile(other)
+
+    if not in_other:  # removed from the template
+        if not in_project:
+            return "skipped"
+        if _file_hash(current) != _file_hash(base):
+            return "kept"
+        if not dry_run:
+            _remove(current, project_dir)
+        return "removed"
+    if not in_project:
+        if in_base:  # the project removed it on purpose
+            return "skipped"
+        if not dry_run:
+            _copy(other, current)
+        return "added"
+
+    current_hash = _file_hash(current)
+    if current_hash == _file_hash(other):
+        return "skipped"
+    if in_base and current_hash == _file_hash(base):  # not changed in the project
+        if not dry_run:
+            _copy(other, current)
+        return "updated"
+
+    # Changed in both (or added to both): merge, with an empty base for files new to the template
+    if _is_binary(current, other):
+        if not dry_run:
+            copy_file(other, current + CONFLICT_SUFFIX, metadata="")
+        return "conflict"
+    with tempfile.NamedTemporaryFile(prefix="a3t-base-") as empty:
+        merged, conflicts = _merge_file(current, base if in_base else empty.name, other, labels)
+    if not dry_run:
+        with open(current, "wb") as file:
+            file.write(merged)
+    return "conflict" if conflicts else "merged"
+
+
+def update_project(project_dir: str, templates: list, commit: str = "", dry_run: bool = False, force: bool = False) -> dict:
+    """Update a generated project to another revision of its template (the latest by default).
+
+    The template is rendered at the recorded commit and at the new one, with the
+    recorded answers (new variables take their defaults) and without hooks. Only
+    files whose hashes differ between the two renders are looked at in the project:
+    files it didn't change are replaced, files both sides changed are three-way
+    merged with `git merge-file`, leaving conflict markers where they overlap.
+    Unchanged snapshots and files come from the cache, so updating many projects
+    costs about the size of the template diff each.
+
+    Returns a report with the `changes` made (or that would be made when `dry_run`).
+    """
+    provenance = read_provenance(project_dir)
+    if provenance["type"] != "cookiecutter":
+        raise RuntimeError(f"a3t update só suporta templates cookiecutter (este é {provenance['type']}).")
+    template = find_template(templates, provenance)
+    old_commit = provenance["commit"]
+    new_commit = commit or template.resolved_commit()
+    report = {
+        "project": os.path.abspath(project_dir),
+        "template": template.config.name,
+        "from": old_commit,
+        "to": new_commit,
+        "changes": [],
+        "conflicts": 0,
+    }
+    if new_commit == old_commit:
+        return report
+    if not dry_run and not force and _dirty(project_dir):
+        raise RuntimeError("O projeto tem alterações não commitadas. Faça commit ou stash antes de atualizar (ou use --force).")
+
+    old, new = _pinned(template, old_commit), _pinned(template, new_commit)
+    # Both snapshots download at the same time when they aren't cached yet
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        list(executor.map(lambda pinned: pinned.snapshot(), (old, new)))
+
+    with tempfile.TemporaryDirectory(prefix="a3t-update-") as workdir:
+        # One after the other: cookiecutter changes the working directory while rendering
+        old_dir, _ = _render(old, provenance["answers"], os.path.join(workdir, "old"))
+        new_dir, answers = _render(new, provenance["answers"], os.path.join(workdir, "new"))
+        old_hashes, new_hashes = _tree_hashes(old_dir), _tree_hashes(new_dir)
+        changed = sorted(path for path in old_hashes.keys() | new_hashes.keys() if old_hashes.get(path) != new_hashes.get(path))
+
+        labels = ("projeto", f"template {old_commit[:7]}", f"template {new_commit[:7]}")
+        for relpath in changed:
+            action = _apply(project_dir, old_dir, new_dir, relpath, labels, dry_run)
+            report["changes"].append({"path": relpath, "action": action})
+            if action == "conflict":
+                report["conflicts"] += 1
+
+    if not dry_run:
+        write_provenance(project_dir, template.config, new_commit, answers)
+    return report
@@ -1,16 +1,20 @@
 #!/usr/bin/env python3
+import sys
 import json
 import typer
 from rich.console import Console
 from rich.panel import Panel
-from rich.traceback import Traceback
 import os
 
 # Import our modules
 from .utils import ui
-from .templates.factory import get_templates, TemplateClass
+from .templates.factory import get_templates, load_catalog, TemplateClass
 from .templates.abs import GitHubAuthError
+from cli.utils.credentials import get_credentials
 from .utils.telemetry import send_telemetry
+from cli.utils.startup import Startup
+from cli.utils.telemetry import user_info
+from cli.utils.tools import probe_tools
 
 
 app = typer.Typer(
@@ -24,26 +28,62 @@ def list_templates(
     json_output: bool = typer.Option(False, "--json", help="Output as JSON")
 ):
     """List available templates."""
-    templates_data = get_templates()
+    templates_data = load_catalog()
     if json_output:
-        output = [t.config.__dict__ for t in templates_data]
+        output = [
+            {
+                **t.config.__dict__,
+                "accessible": t.remote.accessible if t.remote else None,
+                "head_commit": t.remote.commit if t.remote else None,
+            }
+            for t in templates_data
+        ]
         console.print(json.dumps(output, indent=2))
     else:
         ui.display_header("Templates disponíveis:")
         for idx, t in enumerate(templates_data):
-            console.print(f"[{idx}] {t.config.name} - {t.config.description}")
+            status = ""
+            if t.remote:
+                status = (
+                    f" [dim]{t.remote.commit[:7]}[/dim]"
+                    if t.remote.accessible
+                    else " [red](sem acesso)[/red]"
+                )
+            console.print(f"[{idx}] {t.config.name} - {t.config.description}{status}")
 
 
 @app.command("build")
 def build_template(
     template_id: int = typer.Option(
         ..., "--template", "-t", help="ID do template (use 'a3t list' para ver os IDs)"
-    )
+    ),
+    fetch: str = typer.Option(
+        "", "--fetch", help="Estratégia de download do template: mirror, shallow, partial, sparse ou archive"
+    ),
+    output_archive: str = typer.Option(
+        "", "--output-archive", help="Grava o projeto em um arquivo .tar.gz, .tar.zst, .tar ou .zip ('-' para stdout) em vez de uma pasta"
+    ),
+    archive_format_option: str = typer.Option(
+        "", "--archive-format", help="Formato do --output-archive: tar.gz, tar.zst, tar ou zip (padrão: pela extensão)"
+    ),
 ):
     """Build a template by ID and options."""
+    if output_archive == "-":
+        # The archive goes to stdout: everything else printed goes to stderr
+        sys.stdout = sys.stderr
+    if fetch:
+        from cli.utils.fetch import resolve_strategy
+
+        try:
+            resolve_strategy(fetch)
+        except ValueError as e:
+            console.print(f"[red]{e}[/red]")
+            raise typer.Exit(1)
     templates_data = get_templates()
 
     template: TemplateClass = templates_data[template_id]
+    if fetch:
+        template.config.fetch = fetch
     send_telemetry(
         {
             "template_name": template.config.name,
@@ -59,17 +99,27 @@ def build_template(
         console.print(f"[red]Template não disponível ou não encontrado.[/red]")
         raise typer.Exit(1)
     try:
-        output_dir, success = ui.get_string_option(
-            "Em qual pasta vc gostaria de criar o template? (Pressione Enter para usar a pasta atual)",
-            default="./.",
-        )
-        console.print(
-            f"[bold]O template será criado na pasta:[/bold] { os.path.abspath(output_dir) }"
-        )
-        if not success:
-            raise KeyboardInterrupt
+        if output_archive:
+            from cli.utils import archive
 
-        template.build(output_dir)
+            with archive.open_archive(output_archive, archive_format_option) as writer:
+                template.build_archive(writer)
+            if output_archive != "-":
+                console.print(f"[bold]Projeto gravado em:[/bold] {os.path.abspath(output_archive)}")
+        else:
+            # Download the template while the user answers the prompt below
+            template.prefetch()
+            output_dir, success = ui.get_string_option(
+                "Em qual pasta vc gostaria de criar o template? (Pressione Enter para usar a pasta atual)",
+                default="./.",
+            )
+            console.print(
+                f"[bold]O template será criado na pasta:[/bold] { os.path.abspath(output_dir) }"
+            )
+            if not success:
+                raise KeyboardInterrupt
+
+            template.build(output_dir)
 
         send_telemetry(
             {
@@ -129,6 +179,13 @@ def main(ctx: typer.Context):
  /_/   \\_\\____/    |_|\\___|_| |_| |_| .__/|_|\\__,_|\\__\\___||___/
                                     |_|
 """
+    # Catalog, credentials, telemetry info and tool checks load while the banner prints
+    startup = Startup(
+        templates=load_catalog,
+        credentials=get_credentials,
+        user_info=user_info,
+        tools=probe_tools,
+    )
     try:
         console.print(title)
         ui.display_header(
@@ -137,10 +194,12 @@ def main(ctx: typer.Context):
         console.print(
             "[bold] GitHub:[/bold] https://github.com/A3Data/templates-cli/issues"
         )
-        # Get available templates with a spinner
-        templates_data = get_templates()
+        with console.status("Carregando templates..."):
+            templates_data = startup.result("templates")
         template: TemplateClass = ui.choose_item(templates_data, "template")
         assert template.is_available(), "Template não disponível ou não encontrado."
+        # Download the template while the user answers the prompts below
+        template.prefetch()
 
         send_telemetry(
             {
@@ -1,5 +1,4 @@
 import json
-from cookiecutter.main import cookiecutter
 from .abs import TemplateConfig, TemplateClass
 
 class CookiecutterTemplate(TemplateClass):
@@ -8,18 +7,38 @@ class CookiecutterTemplate(TemplateClass):
 
     def build(self, output_dir: str) -> None:
         """Build the cookiecutter template"""
+        from cli.utils.render import run_cookiecutter
+
         try:
             # options = json.loads(config)
             # no_input = options != {}
-            cookiecutter(
-                f"gh:{self.config.organization}/{self.config.repository}",
+            # cookiecutter (and jinja2) only load here, when a template is actually built
+            run_cookiecutter(
+                self._sources(),
                 no_input=False,
                 # extra_context=options,
                 output_dir=output_dir,
-                checkout=self.config.branch,
+                directory=self.config.subdirectory or None,
+            )
+        except Exception as e:
+            raise RuntimeError(f"Failed to build template: {str(e)}")
+
+    def build_archive(self, archive) -> None:
+        """Render the template straight into `archive`, without writing the project to disk"""
+        from cli.utils.render import run_cookiecutter
+
+        try:
+            run_cookiecutter(
+                self._sources(),
+                archive=archive,
+                no_input=False,
+                directory=self.config.subdirectory or None,
             )
         except Exception as e:
             raise RuntimeError(f"Failed to build template: {str(e)}")
-    
+
+    def _fetch_sources(self) -> str:
+        return self.snapshot()
+
     def is_available(self):
-        return True
+        return self.remote is None or self.remote.accessible
@@ -1,7 +1,4 @@
 import os
-import yaml
-import requests
-import base64
 from .abs import TemplateConfig, TemplateClass
 from .git_repo import GithubRepositoryTemplate
 from .cookiecutter import CookiecutterTemplate
@@ -18,6 +15,8 @@ USE_LOCAL=False
 
 
 def get_local_templates() -> list[TemplateConfig]:
+    import yaml
+
     local_path = "/home/andrebrandao_a3data/templates-cli/templates.yaml"
     if not os.path.exists(local_path):
         raise FileNotFoundError(f"Local templates.yaml not found at {local_path}")
@@ -33,6 +32,9 @@ def get_local_templates() -> list[TemplateConfig]:
             repository=template["repository"],
             branch=template.get("branch", GITHUB_BRANCH),
             configPath=template.get("configPath", "config.yaml"),
+            fetch=template.get("fetch", ""),
+            subdirectory=template.get("subdirectory", ""),
+            commit=template.get("commit", ""),
         )
         for template in template_configs
     ]
@@ -44,23 +46,13 @@ def get_github_templates() -> list[TemplateConfig]:
     
     if USE_LOCAL:
         return get_local_templates()
+    import requests
+    from cli.utils.catalog import fetch_catalog
+
     try:
-        # Fetch templates.yaml from GitHub
-        # TODO: add headers + accept type to skip base64 dencoding 
+        # Fetch templates.yaml from GitHub (served from the local catalog cache when fresh)
         url = f"https://api.github.com/repos/{GITHUB_REPO_OWNER}/{GITHUB_REPO_NAME}/contents/{TEMPLATE_FILE_PATH}?ref={GITHUB_BRANCH}"
-        response = requests.get(url)
-
-        if response.status_code == 401:
-            raise ValueError("Você não possui acesso a esse repositório ou não esta logado na conta do github. Execute `gh auth login` primeiro.")
-    
-        response.raise_for_status()
-                
-        content = response.json()
-        # Decode content from base64
-        file_content = base64.b64decode(content["content"]).decode("utf-8")
-
-        # Parse YAML content
-        data = yaml.safe_load(file_content)
+        data = fetch_catalog(url)
         
         version = data.get("version",None)
         if version != CLI_VERSION:
@@ -81,6 +73,9 @@ def get_github_templates() -> list[TemplateConfig]:
                 repository=template["repository"],
                 branch=template.get("branch", GITHUB_BRANCH),
                 configPath=template.get("configPath", ""),
+                fetch=template.get("fetch", ""),
+                subdirectory=template.get("subdirectory", ""),
+                commit=template.get("commit", ""),
             )
             for template in template_configs
         ]
@@ -123,3 +118,17 @@ def get_templates() -> list[TemplateClass]:
     return templates
 
 
+def enrich_templates(templates: list[TemplateClass]) -> None:
+    """Attach GitHub access, head commit and option file to every template with a single request"""
+    from cli.utils.graphql import fetch_remote_info
+
+    infos = fetch_remote_info([template.config for template in templates])
+    for template, info in zip(templates, infos):
+        template.remote = info
+
+
+def load_catalog() -> list[TemplateClass]:
+    """get_templates() followed by enrich_templates(), as used by listings and the picker"""
+    templates = get_templates()
+    enrich_templates(templates)
+    return templates
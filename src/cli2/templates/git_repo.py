@@ -1,7 +1,9 @@
-import json
-import subprocess
 from .abs import TemplateConfig, TemplateClass
 import os
+import atexit
+import shutil
+import tempfile
+import subprocess
 
 
 def ensure_dir(path: str) -> None:
@@ -13,20 +15,87 @@ class GithubRepositoryTemplate(TemplateClass):
     def __init__(self, config: TemplateConfig):
         super().__init__(config)
 
+    def _fetch_sources(self) -> str:
+        """Download the repository into a temporary directory, moved into place by build()"""
+        from cli.utils.fetch import fetch_repository, resolve_strategy
+
+        if resolve_strategy(self.config.fetch) == "archive":
+            # Plain file tree, served from the commit-keyed snapshot cache
+            return self.snapshot()
+        workdir = tempfile.mkdtemp(prefix="a3t-")
+        # Left behind when the build is abandoned (prompt cancelled, error before build())
+        atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+        dest = os.path.join(workdir, self.config.repository)
+        fetch_repository(
+            self.config.organization,
+            self.config.repository,
+            self.config.branch or "master",
+            dest,
+            strategy=resolve_strategy(self.config.fetch),
+            subdirectory=self.config.subdirectory,
+            commit=self.config.commit,
+        )
+        return dest
+
     def build(self, output_dir: str) -> None:
         """Build the github repository template"""
+        from cli.utils.fastcopy import copy_tree
+        from cli.utils.fetch import resolve_strategy
+
         try:
             ensure_dir(output_dir)
-            repo_url = f"https://github.com/{self.config.organization}/{self.config.repository}.git"
-            branch = self.config.branch or "master"
-            result =  subprocess.run(
-                ["git", "clone", repo_url,"--branch", branch],
-                check=True,
-                cwd=os.path.abspath(output_dir)
-            )
+            dest = os.path.join(os.path.abspath(output_dir), self.config.repository)
+            if os.path.exists(dest):
+                # Like `git clone`: an empty directory is reused, anything else is an error
+                if not os.path.isdir(dest) or os.listdir(dest):
+                    raise RuntimeError(f"destination path '{dest}' already exists and is not an empty directory")
+                os.rmdir(dest)
+            sources = self._sources()
+            if resolve_strategy(self.config.fetch) == "archive":
+                # Only the template root, even when the snapshot holds the whole repository
+                copy_tree(os.path.join(sources, self.config.subdirectory), dest)
+                return
+            shutil.move(sources, dest)
+            shutil.rmtree(os.path.dirname(sources), ignore_errors=True)
             
         except Exception as e:
             raise RuntimeError(f"Failed to build template: {str(e)}")
-    
+
+    def build_archive(self, archive) -> None:
+        """Stream the repository tree into `archive` with `git archive`, without a checkout.
+
+        With the mirror strategy the tree is read from the local mirror; other
+        strategies archive the clone they download (without its .git).
+        """
+        from cli.utils.fetch import resolve_strategy
+        from cli.utils.mirror import update_mirror
+
+        try:
+            strategy = resolve_strategy(self.config.fetch)
+            if strategy == "archive":
+                archive.add_tree(os.path.join(self._sources(), self.config.subdirectory), self.config.repository, symlinks=False)
+                return
+            clone = None
+            if strategy == "mirror":
+                repository = update_mirror(self.config.organization, self.config.repository)
+                ref = self.config.commit or f"refs/heads/{self.config.branch or 'master'}"
+            else:
+                clone = self._sources()
+                repository, ref = clone, "HEAD"
+            try:
+                process = subprocess.Popen(
+                    ["git", "archive", "--format=tar", f"--prefix={self.config.repository}/", ref],
+                    cwd=repository, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                )
+                archive.add_tar_stream(process.stdout)
+                stderr = process.stderr.read().decode(errors="replace")
+                if process.wait() != 0:
+                    raise RuntimeError(f"git archive failed: {stderr.strip()}")
+            finally:
+                if clone:
+                    shutil.rmtree(os.path.dirname(clone), ignore_errors=True)
+        except Exception as e:
+            raise RuntimeError(f"Failed to build template: {str(e)}")
+
     def is_available(self):
-        return True
+        return self.remote is None or self.remote.accessible